@@ -2,15 +2,23 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import time
 import threading
-import json
 import os
 from PIL import Image, ImageTk
 import requests
-import hashlib
 import uuid
-import random
+from baidu_client import BaiduApiError
+from translation_backends import BaiduBackend
+from offline_dictionary import OfflineDictionary
+from path_watcher import PathWatcher, canonical_path
+from notes_io import open_text_store
+from path_trie import PathTrie
+from animation_scheduler import AnimationScheduler, VisibilityGovernor
 
 class DesktopPet:
+    # 呼吸动画每一帧的宠物大小（从80像素慢慢变大到85再变回来），每帧100毫秒
+    BREATH_SIZES = (80, 81, 82, 83, 84, 85, 84, 83, 82, 81)
+    BREATH_INTERVAL = 100
+
     def __init__(self, root):
         self.root = root
         self.root.title("桌面宠物")
@@ -22,14 +30,21 @@ class DesktopPet:
         self.baidu_appid = '您的百度翻译APPID'  # 请在百度翻译开放平台申请
         self.baidu_key = '您的百度翻译密钥'     # 请在百度翻译开放平台申请
         
+        # 离线词典（第一次查询时才打开）
+        self.offline_dict = OfflineDictionary("offline_dict.db")
+        
         # 宠物状态
         self.is_dragging = False
         self.drag_start_x = 0
         self.drag_start_y = 0
         
-        # 文件夹注释存储文件
+        # 文件夹注释存储文件（和file_notes_manager共用 文件名|注释 格式）
         self.notes_file = "folder_notes.txt"
         self.folder_notes = self.load_folder_notes()
+        # 查询子文件夹时，用前缀树找最近的有注释的上级文件夹
+        self.path_trie = PathTrie().attach(self.folder_notes)
+        # 注释以路径为键，文件夹移动、改名后注释跟着走，删除后清理掉
+        self.notes_watcher = PathWatcher(self.folder_notes, self.notes_file + ".ids").start()
         
         # 创建GUI
         self.create_gui()
@@ -38,7 +53,9 @@ class DesktopPet:
         self.reminder_thread = threading.Thread(target=self.reminder_loop, daemon=True)
         self.reminder_thread.start()
         
-        # 启动宠物动画
+        # 启动宠物动画（由主线程的定时器驱动，窗口隐藏或最小化时暂停）
+        self.animation_scheduler = AnimationScheduler(self.root)
+        self.visibility_governor = VisibilityGovernor(self.root, self.animation_scheduler)
         self.animate_pet()
     
     def create_gui(self):
@@ -82,7 +99,7 @@ class DesktopPet:
         
         # 关闭按钮
         self.close_btn = tk.Button(self.button_frame, text="关闭", 
-                                  command=self.root.quit, bg='pink')
+                                  command=self.close, bg='pink')
         self.close_btn.pack(side='left', padx=2, fill='x', expand=True)
         
         # 绑定拖动事件
@@ -93,6 +110,13 @@ class DesktopPet:
         # 初始位置
         self.root.geometry("+100+100")
     
+    def close(self):
+        """关闭桌面宠物"""
+        # 停止监视文件夹变化并关闭注释存储
+        self.notes_watcher.stop()
+        self.folder_notes.close()
+        self.root.quit()
+    
     def create_pet_image(self):
         # 创建一个简单的宠物图像（实际应用中可以使用真实图片）
         image = Image.new('RGB', (80, 80), color='lightblue')
@@ -117,23 +141,19 @@ class DesktopPet:
     
     def animate_pet(self):
         # 简单的动画效果 - 改变宠物大小
-        def animate():
-            size = 80
-            while True:
-                for i in range(5):
-                    new_size = size + i
-                    image = Image.new('RGB', (new_size, new_size), color='lightblue')
-                    self.pet_image = ImageTk.PhotoImage(image)
-                    self.pet_label.config(image=self.pet_image)
-                    time.sleep(0.1)
-                for i in range(5, 0, -1):
-                    new_size = size + i
-                    image = Image.new('RGB', (new_size, new_size), color='lightblue')
-                    self.pet_image = ImageTk.PhotoImage(image)
-                    self.pet_label.config(image=self.pet_image)
-                    time.sleep(0.1)
-        
-        threading.Thread(target=animate, daemon=True).start()
+        # 每种大小的图片只在这里创建一次，之后按顺序循环显示，不再创建新图片
+        images = {}
+        for size in self.BREATH_SIZES:
+            if size not in images:
+                images[size] = ImageTk.PhotoImage(Image.new('RGB', (size, size), color='lightblue'))
+        self.pet_frames = [images[size] for size in self.BREATH_SIZES]
+        self.pet_frame_index = 0
+        self.animation_scheduler.schedule(self.next_pet_frame, 0, self.BREATH_INTERVAL)
+    
+    def next_pet_frame(self):
+        # 显示呼吸动画的下一帧
+        self.pet_label.config(image=self.pet_frames[self.pet_frame_index])
+        self.pet_frame_index = (self.pet_frame_index + 1) % len(self.pet_frames)
     
     def translate_text(self):
         text = simpledialog.askstring("翻译", "请输入要翻译的英文文本:")
@@ -156,71 +176,30 @@ class DesktopPet:
         if self.baidu_appid == '您的百度翻译APPID' or self.baidu_key == '您的百度翻译密钥':
             return self.fallback_translate(text)
         
-        # 生成随机数
-        salt = str(random.randint(32768, 65536))
-        # 计算签名
-        sign = self.baidu_appid + text + salt + self.baidu_key
-        sign = hashlib.md5(sign.encode()).hexdigest()
-        
-        # 构造请求URL
-        url = 'https://fanyi-api.baidu.com/api/trans/vip/translate'
-        params = {
-            'q': text,
-            'from': from_lang,
-            'to': to_lang,
-            'appid': self.baidu_appid,
-            'salt': salt,
-            'sign': sign
-        }
-        
         try:
-            # 发送请求
-            response = requests.get(url, params=params, timeout=10)
-            result = response.json()
-            
-            # 检查是否有错误
-            if 'error_code' in result:
-                error_msg = result.get('error_msg', '未知错误')
-                raise Exception(f"百度翻译API错误: {error_msg}")
-            
-            # 提取翻译结果
-            if 'trans_result' in result:
-                translated_text = '\n'.join([item['dst'] for item in result['trans_result']])
-                return translated_text
-            else:
-                raise Exception("未找到翻译结果")
-                
+            # 和翻译管理器共用同一个百度翻译后端实现（连接复用、限速和限频重试）
+            backend = BaiduBackend(self.baidu_appid, self.baidu_key)
+            return backend.translate(text, from_lang, to_lang)
+        
+        except BaiduApiError as e:
+            raise Exception(f"百度翻译API错误: {e.error_msg}")
         except requests.exceptions.RequestException as e:
-            raise Exception(f"网络请求失败: {str(e)}")
+            # 网络不通时改用离线词典
+            print(f"网络请求失败，使用离线词典: {str(e)}")
+            return self.fallback_translate(text)
         except Exception as e:
             raise Exception(f"翻译处理失败: {str(e)}")
     
     def fallback_translate(self, text):
         """
-        备用翻译方法（当百度翻译API未配置时使用）
+        备用翻译方法（当百度翻译API未配置或连不上时使用）
         """
-        translations = {
-            "hello": "你好",
-            "world": "世界",
-            "good morning": "早上好",
-            "thank you": "谢谢",
-            "goodbye": "再见",
-            "file": "文件",
-            "save": "保存",
-            "folder": "文件夹",
-            "note": "注释",
-            "computer": "电脑",
-            "program": "程序",
-            "python": "Python编程语言",
-            "desktop": "桌面",
-            "pet": "宠物"
-        }
-        
-        text_lower = text.lower().strip()
-        if text_lower in translations:
-            return translations[text_lower]
+        # 离线词典：按最长词组匹配逐词翻译
+        result = self.offline_dict.translate(text)
+        if result:
+            return result
         else:
-            # 如果找不到精确匹配，返回模拟翻译结果
+            # 如果词典里一个词都没有，返回模拟翻译结果
             return f"'{text}' 的翻译结果（请配置百度翻译API获得准确翻译）"
     
     def reminder_loop(self):
@@ -236,19 +215,8 @@ class DesktopPet:
         self.root.after(0, lambda: messagebox.showinfo("桌面宠物", message))
     
     def load_folder_notes(self):
-        # 从文件加载文件夹注释
-        if os.path.exists(self.notes_file):
-            try:
-                with open(self.notes_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-    
-    def save_folder_notes(self):
-        # 保存文件夹注释到文件
-        with open(self.notes_file, 'w', encoding='utf-8') as f:
-            json.dump(self.folder_notes, f, ensure_ascii=False, indent=2)
+        # 从文件加载文件夹注释（以前的JSON格式会自动迁移），保存时直接写入存储
+        return open_text_store(self.notes_file)
     
     def add_folder_note(self):
         folder_path = simpledialog.askstring("添加文件夹注释", "请输入文件夹路径:")
@@ -256,8 +224,8 @@ class DesktopPet:
             if os.path.isdir(folder_path):
                 note = simpledialog.askstring("添加文件夹注释", f"请输入对文件夹 '{folder_path}' 的注释:")
                 if note:
-                    self.folder_notes[folder_path] = note
-                    self.save_folder_notes()
+                    # 用规范化的绝对路径做键，同一个文件夹换种写法也能查到
+                    self.folder_notes.set(canonical_path(folder_path), note)
                     self.show_message(f"已为文件夹 '{folder_path}' 添加注释: {note}")
             else:
                 self.show_message("指定的路径不是文件夹或不存在！")
@@ -265,9 +233,17 @@ class DesktopPet:
     def query_folder_note(self):
         folder_path = simpledialog.askstring("查询文件夹注释", "请输入要查询的文件夹路径:")
         if folder_path:
-            if folder_path in self.folder_notes:
-                note = self.folder_notes[folder_path]
+            key = canonical_path(folder_path)
+            note = self.folder_notes.get(key)
+            if note is None:
+                # 以前按输入的原样保存的注释
+                note = self.folder_notes.get(folder_path)
+            # 没有单独的注释时，找最近的有注释的上级文件夹
+            parent = self.path_trie.nearest(key) if note is None else None
+            if note is not None:
                 self.show_message(f"文件夹 '{folder_path}' 的注释: {note}")
+            elif parent is not None:
+                self.show_message(f"文件夹 '{folder_path}' 在 '{parent}' 里面，那个文件夹的注释: {self.folder_notes.get(parent)}")
             else:
                 self.show_message(f"未找到文件夹 '{folder_path}' 的注释。")
 
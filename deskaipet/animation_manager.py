@@ -1,256 +1,146 @@
-import threading
-import time
-from PIL import Image, ImageTk
-import os
+from animation_scheduler import AnimationScheduler
+from animation_timeline import Timeline, TimelinePlayer, load_animations
+from frame_cache import FrameCache
+from frame_store import FrameStore
 
 class PetAnimation:
-    def __init__(self, pet_label):
+    def __init__(self, pet_label, scheduler=None, frame_cache=None, animations_file="animations.json",
+                 frame_capacity=64):
         """
         宠物动画管理器
         
+        所有动画都由调度器的定时器在主线程里驱动，播放动画不会开线程。
+        动画定义在 animations.json 里（帧和关键帧时间线），添加动画只需要改这个文件；
+        帧可以是静态图片、动画GIF/APNG的某一帧或精灵图的一格
+        
         Args:
             pet_label: tkinter Label控件，用于显示宠物表情
+            scheduler: AnimationScheduler，None时用pet_label新建一个
+            frame_cache: 缩放好的表情帧的磁盘缓存，None时使用默认的 frame_cache 目录
+            animations_file: 动画定义文件
+            frame_capacity: 最多同时保留多少帧解码好的图片
         """
         self.pet_label = pet_label
-        self.current_expression = "close"
-        self.expression_frame = 2
-        self.animation_active = False
-        self.animation_thread = None
-        self.current_animation = None
+        self.scheduler = scheduler or AnimationScheduler(pet_label)
+        self.frame_cache = frame_cache or FrameCache()
+        self.frame_capacity = frame_capacity
+        self.current_expression = None
+        self.current_image = None
+        # 换帧次数和因为图片没变而跳过的次数
+        self.renders = 0
+        self.skipped_renders = 0
         
-        # 表情图片字典
-        self.expressions = {
-            "open1": None,
-            "close": None,  
-            "open2": None,  
-            "denying": None
-        }
+        # 读取动画定义
+        try:
+            self.frames, self.timelines, self.default_animation = load_animations(animations_file)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"读取动画定义失败: {e}")
+            self.frames = {"close": {'file': None, 'index': 0, 'rect': None, 'color': 'lightblue'}}
+            self.timelines = {"idle": Timeline("idle", [{'frame': "close"}], 100, loop=True)}
+            self.default_animation = "idle"
         
-        # 加载表情图片
+        # 表情图片
         self.load_expressions()
         
-        # print("动画管理器初始化完成")
+        self.player = TimelinePlayer(self.scheduler, self.set_expression, self.timelines, self.default_animation)
+        # 显示默认动画
+        self.play_default_animation()
     
     def load_expressions(self):
         """
-        加载表情图片
+        准备表情图片：不在这里解码，每一帧第一次显示时才加载（见 FrameStore）
         """
-        try:
-            # 尝试加载图片文件
-            image_paths = {
-                "open1": "face1.1.1.png",     
-                "close": "face1.2.1.png", 
-                "open2": "face1.3.png",  
-                "denying": "face1.4.png"   
-            }
-            
-            for expr_name, file_path in image_paths.items():
-                if os.path.exists(file_path):
-                    image = Image.open(file_path)
-                    image = image.resize((80, 80), Image.Resampling.LANCZOS)
-                    self.expressions[expr_name] = ImageTk.PhotoImage(image)
-                    # print(f"加载表情图片成功: {file_path}")
-                else:
-                    # 如果图片文件不存在，创建彩色默认图片
-                    colors = {
-                        "open1": "lightblue",
-                        "close": "lightblue",
-                        "open2": "lightblue",
-                        "denying": "lightcoral"
-                    }
-                    image = Image.new('RGB', (80, 80), color=colors[expr_name])
-                    self.expressions[expr_name] = ImageTk.PhotoImage(image)
-                    print(f"创建默认表情图片: {expr_name}")
-        except Exception as e:
-            print(f"加载表情图片失败: {e}")
-            # 创建默认的彩色图片
-            colors = {
-                "open1": "lightblue",
-                "close": "lightblue",
-                "open2": "lightblue",
-                "denying": "lightcoral"
-            }
-            for expr_name, color in colors.items():
-                image = Image.new('RGB', (80, 80), color=color)
-                self.expressions[expr_name] = ImageTk.PhotoImage(image)
+        self.expressions = FrameStore(self.frames, self.frame_cache, (80, 80), self.frame_capacity)
     
-    def set_expression(self, expression):
-        """设置宠物表情"""
-        if expression != self.current_expression:
-            self.current_expression = expression
-            self.update_expression_display()
+    @property
+    def animation_active(self):
+        """是否在播放指定的动画（回到待机动画后为False）"""
+        return self.player.active
     
-    def update_expression_display(self):
-        """更新表情显示"""
+    @property
+    def current_animation(self):
+        """当前的动画名称"""
+        return self.player.timeline.name if self.player.timeline is not None else None
+    
+    def set_expression(self, expression):
+        """
+        设置宠物表情（显示一帧）
+        
+        和正在显示的是同一张图片时不调用 label.config，Tk不需要重绘
+        """
+        if expression == self.current_expression:
+            self.skipped_renders += 1
+            return
+        image = self.expressions.get(expression)
+        if image is None:
+            print(f"没有名为 {expression} 的表情")
+            return
         try:
-            if self.current_expression == "talking1":
-                # 说话时在1和2之间交替
-                if self.expression_frame == 1:
-                    self.pet_label.config(image=self.expressions["open1"])
-                    self.expression_frame = 2
-                else:
-                    self.pet_label.config(image=self.expressions["open2"])
-                    self.expression_frame = 1
-            elif self.current_expression == "talking2":
-                # 说话时在2和3之间交替
-                if self.expression_frame == 3:
-                    self.pet_label.config(image=self.expressions["open2"])
-                    self.expression_frame = 2    
-                else:
-                    self.pet_label.config(image=self.expressions["open1"])
-                    self.expression_frame = 3
-            elif self.current_expression == "denying":
-                # 否认时显示4
-                self.pet_label.config(image=self.expressions["denying"])
-            else:
-                # 待机时显示2
-                self.pet_label.config(image=self.expressions["close"])
-                self.expression_frame = 2
+            self.pet_label.config(image=image)
+            self.current_expression = expression
+            # 持有正在显示的图片，它被FrameStore丢掉后也不会从界面上消失
+            self.current_image = image
+            self.renders += 1
         except Exception as e:
             print(f"更新表情显示失败: {e}")
     
+    def play(self, name, duration=None):
+        """
+        播放animations.json里定义的动画
+        
+        Args:
+            name: 动画名称
+            duration: 持续时间（秒），None表示按时间线本身的长度（循环动画一直播放）
+        """
+        if name not in self.timelines:
+            print(f"没有名为 {name} 的动画")
+            return None
+        return self.player.play(name, duration)
+    
+    def play_default_animation(self):
+        """回到默认（待机）动画"""
+        if self.default_animation is not None:
+            self.player.play(self.default_animation, active=False)
+    
     def stop_current_animation(self):
-        """停止当前动画"""
-        self.animation_active = False
-        # 不再尝试加入当前线程，因为这会导致错误
+        """停止当前动画，停在当前帧"""
+        self.player.stop()
     
     def play_idle_animation(self, duration=5):
         """播放待机动画"""
-        def idle_animation():
-            self.animation_active = True
-            self.current_animation = "idle"
-            
-            start_time = time.time()
-            while self.animation_active and (time.time() - start_time) < duration:
-                self.set_expression("close")
-                time.sleep(0.5)
-                if not self.animation_active:
-                    break
-                    
-            # 动画结束后回到默认状态
-            if self.current_animation == "idle":
-                self.set_expression("close")
-                self.animation_active = False
-        
-        # 如果已经有动画在运行，先停止它
-        self.stop_current_animation()
-        
-        self.animation_thread = threading.Thread(target=idle_animation, daemon=True)
-        self.animation_thread.start()
-        # print(f"开始播放待机动画，持续时间: {duration}秒")
-        return self.animation_thread
+        return self.play("idle", duration)
     
     def play_talking_animation1(self, duration=3):
         """播放说话动画1"""
-        def talking_animation():
-            self.animation_active = True
-            self.current_animation = "talking1"
-            
-            start_time = time.time()
-            while self.animation_active and (time.time() - start_time) < duration:
-                self.set_expression("talking1")
-                time.sleep(0.3)
-                if not self.animation_active:
-                    break
-                    
-            # 动画结束后回到默认状态
-            if self.current_animation == "talking1":
-                self.set_expression("close")
-                self.animation_active = False
-        
-        # 如果已经有动画在运行，先停止它
-        self.stop_current_animation()
-        
-        self.animation_thread = threading.Thread(target=talking_animation, daemon=True)
-        self.animation_thread.start()
-        # print(f"开始播放说话动画1，持续时间: {duration}秒")
-        return self.animation_thread
+        return self.play("talking1", duration)
     
     def play_talking_animation2(self, duration=3):
         """播放说话动画2"""
-        def talking_animation():
-            self.animation_active = True
-            self.current_animation = "talking2"
-            
-            start_time = time.time()
-            while self.animation_active and (time.time() - start_time) < duration:
-                self.set_expression("talking2")
-                time.sleep(0.3)
-                if not self.animation_active:
-                    break
-                    
-            # 动画结束后回到默认状态
-            if self.current_animation == "talking2":
-                self.set_expression("close")
-                self.animation_active = False
-        
-        # 如果已经有动画在运行，先停止它
-        self.stop_current_animation()
-        
-        self.animation_thread = threading.Thread(target=talking_animation, daemon=True)
-        self.animation_thread.start()
-        # print(f"开始播放说话动画2，持续时间: {duration}秒")
-        return self.animation_thread
+        return self.play("talking2", duration)
     
     def play_denying_animation(self, duration=2):
         """播放否认动画"""
-        def denying_animation():
-            self.animation_active = True
-            self.current_animation = "denying"
-            
-            start_time = time.time()
-            while self.animation_active and (time.time() - start_time) < duration:
-                self.set_expression("denying")
-                time.sleep(0.1)
-                if not self.animation_active:
-                    break
-                    
-            # 动画结束后回到默认状态
-            if self.current_animation == "denying":
-                self.set_expression("close")
-                self.animation_active = False
-        
-        # 如果已经有动画在运行，先停止它
-        self.stop_current_animation()
-        
-        self.animation_thread = threading.Thread(target=denying_animation, daemon=True)
-        self.animation_thread.start()
-        # print(f"开始播放否认动画，持续时间: {duration}秒")
-        return self.animation_thread
+        return self.play("denying", duration)
     
     def play_single_expression(self, expression, duration=2):
         """播放单个表情动画"""
-        def single_animation():
-            self.animation_active = True
-            self.current_animation = expression
-            
-            # 设置指定表情
-            self.set_expression(expression)
-            
-            # 保持指定时间
-            start_time = time.time()
-            while self.animation_active and (time.time() - start_time) < duration:
-                time.sleep(0.1)
-                if not self.animation_active:
-                    break
-            
-            # 动画结束后回到默认状态
-            if self.current_animation == expression:
-                self.set_expression("close")
-                self.animation_active = False
-        
-        # 如果已经有动画在运行，先停止它
-        self.stop_current_animation()
-        
-        self.animation_thread = threading.Thread(target=single_animation, daemon=True)
-        self.animation_thread.start()
-        # print(f"开始播放表情动画: {expression}，持续时间: {duration}秒")
-        return self.animation_thread
+        if expression in self.timelines:
+            return self.play(expression, duration)
+        if expression not in self.expressions:
+            print(f"没有名为 {expression} 的表情")
+            return None
+        # 只有这一帧的循环时间线，到时间后回到默认动画
+        timeline = Timeline(expression, [{'frame': expression}], 100, loop=True)
+        return self.player.play(timeline, duration)
     
     def get_available_expressions(self):
         """获取可用的表情列表"""
         return list(self.expressions.keys())
     
+    def get_available_animations(self):
+        """获取可用的动画列表"""
+        return list(self.timelines.keys())
+    
     def is_animation_playing(self):
         """检查是否有动画正在播放"""
-        return self.animation_active and self.animation_thread and self.animation_thread.is_alive()
\ No newline at end of file
+        return self.animation_active
\ No newline at end of file
@@ -0,0 +1,248 @@
+import heapq
+import itertools
+import threading
+import time
+
+class _Job:
+    __slots__ = ('callback', 'interval', 'due', 'end', 'on_finish', 'cancelled', 'finishing')
+
+    def __init__(self, callback, due, interval, end, on_finish):
+        self.callback = callback
+        self.due = due
+        self.interval = interval
+        self.end = end
+        self.on_finish = on_finish
+        self.cancelled = False
+        # 已经执行完最后一帧，只等到结束时间调用on_finish
+        self.finishing = False
+
+class AnimationScheduler:
+    def __init__(self, widget):
+        """
+        动画调度器：所有动画共用一个 widget.after 定时器，在主线程里按时间顺序执行
+
+        不开任何线程，Tk控件只在主线程里修改。任务按截止时间放在堆里，
+        每次定时器到期执行所有到期的任务，再把定时器设到下一个最早的截止时间。
+        周期任务的下一次时间按 上次截止时间 + 间隔 计算，不会因为执行耗时越拖越晚；
+        落后超过一个间隔时（例如窗口被拖动时主线程卡住）跳过错过的帧，不会补着连续执行。
+
+        只能在主线程里调用（在其它线程里请用 root.after(0, ...) 转到主线程）
+
+        Args:
+            widget: 任意Tk控件，用它的 after/after_cancel
+        """
+        self.widget = widget
+        self._heap = []
+        self._counter = itertools.count()
+        self._timer = None
+        self._timer_due = None
+        self._paused_at = None
+        self.ticks = 0
+
+    def schedule(self, callback, delay=0, interval=None, duration=None, on_finish=None):
+        """
+        添加一个任务
+
+        Args:
+            callback: 到时间时调用的函数（无参数）
+            delay: 第一次执行前等待的毫秒数
+            interval: 重复执行的间隔（毫秒），None表示只执行一次
+            duration: 重复执行的总时长（毫秒），None表示一直重复直到取消
+            on_finish: 任务正常结束（不是被取消）后调用的函数
+
+        Returns:
+            任务对象，传给cancel可以取消
+        """
+        now = time.perf_counter()
+        due = now + delay / 1000
+        end = now + duration / 1000 if duration is not None else None
+        job = _Job(callback, due, interval / 1000 if interval else None, end, on_finish)
+        heapq.heappush(self._heap, (due, next(self._counter), job))
+        self._arm()
+        return job
+
+    def cancel(self, job):
+        """取消任务（不会调用on_finish）；已经结束或取消的任务什么也不做"""
+        if job is not None:
+            job.cancelled = True
+
+    def cancel_all(self):
+        """取消所有任务并停止定时器"""
+        for _, _, job in self._heap:
+            job.cancelled = True
+        self._heap = []
+        if self._timer is not None:
+            self.widget.after_cancel(self._timer)
+            self._timer = None
+            self._timer_due = None
+
+    @property
+    def paused(self):
+        return self._paused_at is not None
+
+    def pause(self):
+        """暂停：停掉定时器，不再醒来（窗口隐藏或最小化时）"""
+        if self._paused_at is not None:
+            return
+        self._paused_at = time.perf_counter()
+        if self._timer is not None:
+            self.widget.after_cancel(self._timer)
+            self._timer = None
+            self._timer_due = None
+
+    def resume(self):
+        """继续：所有任务的时间往后顺延暂停的时长，动画从暂停的地方接着播放"""
+        if self._paused_at is None:
+            return
+        offset = time.perf_counter() - self._paused_at
+        self._paused_at = None
+        heap = []
+        for due, order, job in self._heap:
+            if job.cancelled:
+                continue
+            job.due += offset
+            if job.end is not None:
+                job.end += offset
+            heap.append((due + offset, order, job))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._arm()
+
+    def pending(self):
+        """还没有结束的任务数"""
+        return sum(1 for _, _, job in self._heap if not job.cancelled)
+
+    def _arm(self):
+        """让定时器在最早的截止时间到期"""
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if not self._heap or self._paused_at is not None:
+            return
+        due = self._heap[0][0]
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self.widget.after_cancel(self._timer)
+        delay = max(0, round((due - time.perf_counter()) * 1000))
+        self._timer = self.widget.after(delay, self._tick)
+        self._timer_due = due
+
+    def _tick(self):
+        self._timer = None
+        self._timer_due = None
+        self.ticks += 1
+        now = time.perf_counter()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            if job.cancelled:
+                continue
+            self._run(job, now)
+        self._arm()
+
+    def _run(self, job, now):
+        """执行一次任务，周期任务放回堆里等下一次"""
+        if not job.finishing:
+            try:
+                job.callback()
+            except Exception as e:
+                print(f"动画任务出错了: {e}")
+            if job.cancelled:
+                return
+            if job.interval is not None:
+                due = job.due + job.interval
+                if due <= now:
+                    # 落后了，跳过错过的帧
+                    due = now + job.interval
+                if job.end is not None and due >= job.end:
+                    # 没有下一帧了，到结束时间再结束
+                    due = job.end
+                    job.finishing = True
+                job.due = due
+                heapq.heappush(self._heap, (due, next(self._counter), job))
+                return
+        job.cancelled = True
+        if job.on_finish is not None:
+            try:
+                job.on_finish()
+            except Exception as e:
+                print(f"动画任务出错了: {e}")
+
+class VisibilityGovernor:
+    def __init__(self, window, scheduler):
+        """
+        窗口被隐藏（withdraw）或最小化时暂停动画调度器，重新显示时继续
+
+        暂停期间定时器完全不触发，看不见的动画不占CPU，也不会唤醒笔记本的处理器
+
+        Args:
+            window: 顶层窗口（Tk或Toplevel）
+            scheduler: AnimationScheduler
+        """
+        self.window = window
+        self.scheduler = scheduler
+        window.bind('<Unmap>', self._on_visibility_change, add='+')
+        window.bind('<Map>', self._on_visibility_change, add='+')
+
+    def _on_visibility_change(self, event):
+        # 绑定在顶层窗口上的事件，子控件的Map/Unmap也会收到，只看窗口本身
+        if event.widget is not self.window:
+            return
+        if self.window.state() in ('withdrawn', 'iconic'):
+            self.scheduler.pause()
+        else:
+            self.scheduler.resume()
+
+def main():
+    # 长时间运行检查：先反复播放各种动画，再空闲、再隐藏窗口，每5秒报告一次
+    # 线程数应该一直不变；空闲和隐藏阶段定时器每秒的触发次数应该是0
+    import argparse
+    import tkinter as tk
+    from animation_manager import PetAnimation
+
+    parser = argparse.ArgumentParser(description="动画调度器的长时间运行检查")
+    parser.add_argument('--seconds', type=float, default=60, help="每个阶段的时长（秒）")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    label = tk.Label(root)
+    label.pack()
+    animation = PetAnimation(label)
+    scheduler = animation.scheduler
+    VisibilityGovernor(root, scheduler)
+    plays = [animation.play_talking_animation1, animation.play_talking_animation2,
+             animation.play_denying_animation, animation.play_idle_animation]
+    step = itertools.count()
+    phase = {'name': "播放动画", 'start': time.perf_counter(), 'ticks': scheduler.ticks}
+
+    def play_next():
+        plays[next(step) % len(plays)](1)
+
+    player_job = scheduler.schedule(play_next, 0, 700)
+
+    def report():
+        # 用after而不是调度器，否则报告本身也会算进调度器的触发次数，而且隐藏窗口后就不报告了
+        elapsed = time.perf_counter() - phase['start']
+        ticks = scheduler.ticks - phase['ticks']
+        print(f"{phase['name']} {elapsed:5.0f}s 线程数: {threading.active_count()}"
+              f"  定时器触发: {ticks / elapsed:.2f}/秒"
+              f"  换帧: {animation.renders}  跳过: {animation.skipped_renders}")
+        if elapsed >= args.seconds:
+            if phase['name'] == "播放动画":
+                scheduler.cancel(player_job)
+                phase['name'] = "空闲"
+            elif phase['name'] == "空闲":
+                animation.play_talking_animation1(3600)
+                root.withdraw()
+                phase['name'] = "隐藏"
+            else:
+                root.destroy()
+                return
+            phase['start'] = time.perf_counter()
+            phase['ticks'] = scheduler.ticks
+        root.after(5000, report)
+
+    root.after(5000, report)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import json
+import math
+import os
+import time
+from PIL import Image
+
+class Timeline:
+    __slots__ = ('name', 'frames', 'holds', 'loop', 'next', 'tick')
+
+    def __init__(self, name, keyframes, tick, loop=False, next=None):
+        """
+        编译好的动画时间线
+
+        把关键帧展开成每个tick一项的表：frames[i] 是第i个tick显示的帧，
+        holds[i] 是从第i个tick开始同一帧还要保持几个tick（循环动画会绕回开头算，
+        整个动画只有一帧时为None，表示永远不用换帧）。
+        播放时按表查下一次换帧的时间，每次都是O(1)，不需要在不换帧的tick醒来
+
+        Args:
+            name: 动画名称
+            keyframes: [{"frame": 帧名称, "duration": 毫秒}] 列表
+            tick: 时间粒度（毫秒），关键帧的时长按它取整
+            loop: 是否循环
+            next: 播放结束后接着播放的动画名称
+        """
+        self.name = name
+        self.tick = tick
+        self.loop = loop
+        self.next = next
+        frames = []
+        for keyframe in keyframes:
+            frames.extend([keyframe['frame']] * max(1, round(keyframe.get('duration', tick) / tick)))
+        if not frames:
+            raise ValueError(f"动画 {name} 没有关键帧")
+        self.frames = frames
+        self.holds = self._compute_holds(frames, loop)
+
+    @staticmethod
+    def _compute_holds(frames, loop):
+        count = len(frames)
+        holds = [1] * count
+        if not loop:
+            for i in range(count - 2, -1, -1):
+                if frames[i] == frames[i + 1]:
+                    holds[i] = holds[i + 1] + 1
+            return holds
+        # 循环动画：从某个换帧的位置开始往回绕一圈
+        changes = [i for i in range(count) if frames[i] != frames[(i + 1) % count]]
+        if not changes:
+            return [None] * count
+        last = changes[0]
+        for step in range(1, count):
+            i = (last - step) % count
+            if frames[i] == frames[(i + 1) % count]:
+                holds[i] = holds[(i + 1) % count] + 1
+        return holds
+
+    def __len__(self):
+        return len(self.frames)
+
+# 动画GIF/APNG里没写时长或者时长太短（不超过10毫秒）的帧，按浏览器的习惯当作100毫秒
+DEFAULT_FRAME_DURATION = 100
+
+def _read_frame_durations(path, count=None):
+    """
+    读取动画GIF/APNG每一帧自己的时长（毫秒）
+
+    Returns:
+        时长列表，长度就是帧数（给出count时只读前count帧）
+    """
+    durations = []
+    with Image.open(path) as image:
+        total = getattr(image, 'n_frames', 1)
+        for i in range(min(total, count) if count else total):
+            image.seek(i)
+            duration = image.info.get('duration') or 0
+            durations.append(int(duration) if duration > 10 else DEFAULT_FRAME_DURATION)
+    return durations
+
+def _expand_frame_set(name, frame_set, directory):
+    """
+    把一个多帧来源（动画GIF/APNG或精灵图）展开成帧定义和一个播放全部帧的动画
+
+    不解码像素；没有给出count（和精灵图的columns）时要打开文件数一下帧数，帧很多的GIF最好写上count。
+    动画GIF/APNG没有给出duration时使用文件里每一帧自己的时长（也要打开文件）
+
+    Returns:
+        ({帧名称: 帧定义}, 动画定义)
+
+    Raises:
+        OSError: 需要打开文件但文件不存在或者读不了
+    """
+    path = os.path.join(directory, frame_set['file'])
+    color = frame_set.get('color', 'lightblue')
+    count = frame_set.get('count')
+    frames = {}
+    if 'frame_size' in frame_set:
+        # 精灵图：按 frame_size 切成格子，从左到右、从上到下编号
+        width, height = frame_set['frame_size']
+        columns = frame_set.get('columns')
+        if columns is None or count is None:
+            with Image.open(path) as image:
+                columns = columns or image.width // width
+                count = count or columns * (image.height // height)
+        for i in range(count):
+            rect = ((i % columns) * width, (i // columns) * height, width, height)
+            frames[f"{name}/{i}"] = {'file': path, 'index': 0, 'rect': rect, 'color': color}
+        durations = [frame_set.get('duration', DEFAULT_FRAME_DURATION)] * count
+    else:
+        # 动画GIF/APNG：每一帧是一个帧定义
+        if 'duration' in frame_set:
+            if count is None:
+                with Image.open(path) as image:
+                    count = getattr(image, 'n_frames', 1)
+            durations = [frame_set['duration']] * count
+        else:
+            durations = _read_frame_durations(path, count)
+            count = len(durations)
+        for i in range(count):
+            frames[f"{name}/{i}"] = {'file': path, 'index': i, 'rect': None, 'color': color}
+    animation = {
+        'keyframes': [
+            {'frame': frame, 'duration': duration} for frame, duration in zip(frames, durations)
+        ],
+        'loop': frame_set.get('loop', True),
+        'next': frame_set.get('next'),
+    }
+    return frames, animation
+
+def load_animations(path="animations.json"):
+    """
+    读取动画定义文件
+
+    格式见 animations.json：
+        frames: {帧名称: {"file": 图片文件（相对于这个JSON文件）, "color": 图片不存在时用的颜色,
+                         "index": 动画GIF/APNG的第几帧, "rect": 精灵图里的区域 [x, y, 宽, 高]}}
+        frame_sets: {名称: {"file": 动画GIF/APNG或精灵图, "frame_size": 精灵图每格的 [宽, 高],
+                            "columns": 精灵图每行几格, "count": 帧数,
+                            "duration": 每帧毫秒数（GIF/APNG默认用文件里每帧的时长）, "loop", "next"}}
+                    展开成帧 "名称/0"、"名称/1"… 和一个依次播放它们的同名动画；
+                    文件打不开的多帧来源会被跳过（连同用到它的动画），不影响其它动画
+        animations: {动画名称: {"keyframes": [{"frame", "duration"}], "loop": 是否循环, "next": 结束后的动画}}
+        default: 默认（待机）动画
+
+    所有关键帧的时长的最大公约数作为tick，保证每个关键帧都正好是整数个tick
+
+    Returns:
+        (帧定义字典, {动画名称: Timeline}, 默认动画名称)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    directory = os.path.dirname(os.path.abspath(path))
+    frames = {}
+    for name, frame in data.get('frames', {}).items():
+        if isinstance(frame, str):
+            frame = {'file': frame}
+        frames[name] = {
+            'file': os.path.join(directory, frame['file']) if frame.get('file') else None,
+            'index': frame.get('index', 0),
+            'rect': tuple(frame['rect']) if frame.get('rect') else None,
+            'color': frame.get('color', 'lightblue'),
+        }
+
+    definitions = dict(data.get('animations', {}))
+    skipped = set()
+    for name, frame_set in data.get('frame_sets', {}).items():
+        try:
+            set_frames, animation = _expand_frame_set(name, frame_set, directory)
+        except OSError as e:
+            print(f"加载动画帧 {name} 失败，跳过: {e}")
+            skipped.add(name)
+            continue
+        frames.update(set_frames)
+        # animations里有同名的动画时以它为准（例如只用其中几帧）
+        definitions.setdefault(name, animation)
+
+    durations = [
+        int(keyframe.get('duration', 100))
+        for definition in definitions.values() for keyframe in definition.get('keyframes', [])
+    ]
+    tick = math.gcd(*durations) if durations else 100
+    timelines = {}
+    for name, definition in definitions.items():
+        missing = [keyframe['frame'] for keyframe in definition.get('keyframes', [])
+                   if keyframe['frame'] not in frames]
+        if missing and all(frame.split('/', 1)[0] in skipped for frame in missing):
+            print(f"动画 {name} 用到的帧没有加载，跳过")
+            continue
+        if missing:
+            raise ValueError(f"动画 {name} 用到了没有定义的帧 {missing[0]}")
+        timelines[name] = Timeline(
+            name, definition.get('keyframes', []), tick,
+            loop=definition.get('loop', False), next=definition.get('next'),
+        )
+    default = data.get('default')
+    if default is not None and default not in timelines:
+        raise ValueError(f"默认动画 {default} 没有定义")
+    return frames, timelines, default
+
+class TimelinePlayer:
+    def __init__(self, scheduler, render, timelines, default=None):
+        """
+        时间线解释器：同一时间播放一条时间线，用调度器在需要换帧的时刻醒来
+
+        Args:
+            scheduler: AnimationScheduler
+            render: render(帧名称)，显示一帧
+            timelines: {动画名称: Timeline}
+            default: 动画结束、又没有指定next时回到的动画
+        """
+        self.scheduler = scheduler
+        self.render = render
+        self.timelines = timelines
+        self.default = default
+        self.timeline = None
+        # 是否在播放通过play指定的动画（回到默认动画后为False）
+        self.active = False
+        self._index = 0
+        self._due = 0.0
+        self._frame_job = None
+        self._end_job = None
+
+    def play(self, name, duration=None, active=True):
+        """
+        从头播放一个动画
+
+        Args:
+            name: 动画名称，也可以直接传入Timeline
+            duration: 持续时间（秒）；None表示播放到时间线结束（循环动画一直播放）
+            active: 是否算作正在播放动画，见 active 属性
+
+        Returns:
+            Timeline
+        """
+        timeline = name if isinstance(name, Timeline) else self.timelines[name]
+        self.stop()
+        self.timeline = timeline
+        self.active = active
+        self._index = 0
+        self._due = time.perf_counter()
+        if duration is not None:
+            self._end_job = self.scheduler.schedule(self._finish, duration * 1000)
+        self._step()
+        return timeline
+
+    def stop(self):
+        """停止当前动画，停在当前帧"""
+        self.scheduler.cancel(self._frame_job)
+        self.scheduler.cancel(self._end_job)
+        self._frame_job = None
+        self._end_job = None
+        self.timeline = None
+        self.active = False
+
+    def _step(self):
+        """显示当前tick的帧，并安排下一次换帧"""
+        self._frame_job = None
+        timeline = self.timeline
+        index = self._index
+        self.render(timeline.frames[index])
+        hold = timeline.holds[index]
+        if hold is None:
+            # 只有一帧的循环动画，等结束时间（如果有）就行
+            return
+        now = time.perf_counter()
+        if self._due < now - timeline.tick / 1000:
+            # 调度器暂停过或者主线程卡住过，从现在开始重新计时，不补播错过的帧
+            self._due = now
+        self._due += hold * timeline.tick / 1000
+        index += hold
+        if index >= len(timeline):
+            if not timeline.loop:
+                self._frame_job = self.scheduler.schedule(self._finish, self._delay())
+                return
+            index %= len(timeline)
+        self._index = index
+        self._frame_job = self.scheduler.schedule(self._step, self._delay())
+
+    def _delay(self):
+        """到下一次换帧还有多少毫秒（按绝对时间计算，不会越拖越晚）"""
+        return max(0, (self._due - time.perf_counter()) * 1000)
+
+    def _finish(self):
+        """当前动画播放完了，接着播放它的next或默认动画"""
+        timeline = self.timeline
+        self.stop()
+        following = (timeline.next if timeline is not None else None) or self.default
+        if following not in self.timelines:
+            # next指向的动画没有加载（例如它的图片打不开）
+            following = self.default
+        if following is not None and following in self.timelines:
+            self.play(following, active=False)
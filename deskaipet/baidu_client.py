@@ -0,0 +1,316 @@
+import hashlib
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BAIDU_TRANSLATE_URL = 'https://fanyi-api.baidu.com/api/trans/vip/translate'
+
+# 表示账户或签名有问题的错误码，出现这些错误码时才认为API配置失效
+# 52003: 未授权用户  54001: 签名错误  58000: 客户端IP非法  90107: 认证未通过或未生效
+AUTH_ERROR_CODES = {'52003', '54001', '58000', '90107'}
+
+# 单次请求的文本长度上限（UTF-8字节数）
+MAX_QUERY_BYTES = 6000
+
+# 译文里不用空格分隔词语的语言，超长的一行分段翻译后直接拼接，其它语言用空格拼接
+NO_SPACE_LANGUAGES = {'zh', 'cht', 'jp', 'wyw', 'yue'}
+
+# 可以稍后重试的错误码
+# 54003: 访问频率受限  54005: 长query请求频繁  52001: 请求超时  52002: 系统错误
+RETRYABLE_ERROR_CODES = {'54003', '54005', '52001', '52002'}
+
+class BaiduApiError(Exception):
+    def __init__(self, error_code, error_msg):
+        """百度翻译API返回的错误"""
+        super().__init__(f"{error_code} - {error_msg}")
+        self.error_code = str(error_code)
+        self.error_msg = error_msg
+
+    def is_auth_error(self):
+        """是否是账户或签名错误"""
+        return self.error_code in AUTH_ERROR_CODES
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        令牌桶限速器
+
+        Args:
+            rate: 每秒补充的令牌数（即允许的QPS），必须大于0
+            capacity: 桶的容量，默认等于rate（至少为1）
+        """
+        if not rate > 0:
+            raise ValueError(f"QPS必须大于0: {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        """
+        修改速率，桶里已有的令牌保留（不超过新的容量），不会因为换速率多放出请求
+        """
+        if not rate > 0:
+            raise ValueError(f"QPS必须大于0: {rate}")
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = float(rate)
+            self.capacity = float(max(1, rate))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self):
+        """取一个令牌，没有令牌时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# 所有翻译请求共用一个Session，复用TCP/TLS连接
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """获取共享的HTTP会话（带连接池和连接错误重试）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+class BaiduClient:
+    # 同一个APPID的所有客户端共用一个限速器
+    _limiters = {}
+    _limiters_lock = threading.Lock()
+
+    def __init__(self, appid, key, qps=1, url=BAIDU_TRANSLATE_URL, timeout=10,
+                 max_retries=3, backoff_base=0.5, session=None):
+        """
+        百度翻译API客户端
+
+        Args:
+            appid: 百度翻译APPID
+            key: 百度翻译密钥
+            qps: 账户的QPS上限（标准版1，高级版10，尊享版100），必须大于0
+            url: 接口地址，测试时可以换成本地的替身服务器
+            timeout: 单次请求超时时间（秒）
+            max_retries: 遇到限频等可重试错误时的最大重试次数
+            backoff_base: 退避等待的基础时间（秒），每次重试翻倍并加随机抖动
+            session: 自定义的requests.Session，默认使用共享会话
+        """
+        if not (isinstance(qps, (int, float)) and qps > 0):
+            raise ValueError(f"QPS必须大于0: {qps}")
+        self.appid = appid
+        self.key = key
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.session = session or get_session()
+        self.limiter = self._get_limiter(appid, qps)
+        
+        # 实际发出的请求数（包括重试），用来观察批量翻译省了多少请求
+        self.request_count = 0
+
+    @classmethod
+    def _get_limiter(cls, appid, qps):
+        """
+        获取APPID对应的限速器
+
+        每个APPID始终只有一个限速器，qps不同时（修改了配置）在原来的限速器上改速率，
+        不换新的限速器：换新的会重新装满令牌，新旧客户端加起来可能超过账户的QPS上限
+        """
+        with cls._limiters_lock:
+            limiter = cls._limiters.get(appid)
+            if limiter is None:
+                limiter = TokenBucket(qps)
+                cls._limiters[appid] = limiter
+            elif limiter.rate != qps:
+                limiter.set_rate(qps)
+            return limiter
+
+    def _sign_params(self, text, from_lang, to_lang):
+        """生成带签名的请求参数"""
+        salt = str(random.randint(32768, 65536))
+        sign = hashlib.md5((self.appid + text + salt + self.key).encode()).hexdigest()
+        return {
+            'q': text,
+            'from': from_lang,
+            'to': to_lang,
+            'appid': self.appid,
+            'salt': salt,
+            'sign': sign
+        }
+
+    def request(self, text, from_lang='auto', to_lang='zh', timeout=None):
+        """
+        发送一次翻译请求
+
+        Returns:
+            接口返回的JSON（包含trans_result）
+
+        Raises:
+            BaiduApiError: 接口返回错误码（可重试的错误码重试用尽后才会抛出）
+            requests.exceptions.RequestException: 网络错误
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            params = self._sign_params(text, from_lang, to_lang)
+            # 用POST发送，长文本不会受URL长度限制
+            self.request_count += 1
+            response = self.session.post(self.url, data=params, timeout=timeout or self.timeout)
+            result = response.json()
+
+            if 'error_code' not in result or str(result['error_code']) == '52000':
+                return result
+
+            error = BaiduApiError(result['error_code'], result.get('error_msg', '未知错误'))
+            if error.error_code not in RETRYABLE_ERROR_CODES or attempt >= self.max_retries:
+                raise error
+
+            # 指数退避，加上随机抖动避免多个请求同时重试
+            delay = self.backoff_base * (2 ** attempt)
+            time.sleep(delay / 2 + random.uniform(0, delay / 2))
+            attempt += 1
+
+    def translate(self, text, from_lang='auto', to_lang='zh'):
+        """翻译文本，返回所有段落的译文（按行拼接）"""
+        result = self.request(text, from_lang, to_lang)
+        if 'trans_result' not in result:
+            raise BaiduApiError('未知错误', "找不到翻译结果")
+        return '\n'.join(item['dst'] for item in result['trans_result'])
+
+    def translate_batch(self, texts, from_lang='auto', to_lang='zh', max_bytes=MAX_QUERY_BYTES):
+        """
+        批量翻译
+
+        把多条文本按行拼成尽量少的请求（每个请求不超过max_bytes），
+        再把返回的每一段trans_result按顺序对应回原来的文本。
+        每行开头和结尾的空白（缩进等）不发给接口，翻译后原样加回去；
+        单独一行就超过max_bytes时，按UTF-8字符边界切成几段分别翻译再拼起来
+
+        Args:
+            texts: 要翻译的文本列表（可以包含多行）
+
+        Returns:
+            与texts一一对应的译文列表，空文本对应空字符串
+        """
+        # 拆成非空行，记录每一行属于哪条文本的哪一行，以及它两边的空白
+        lines = []
+        layouts = []
+        for text in texts:
+            layout = []
+            for line in text.split('\n'):
+                content = line.strip()
+                if not content:
+                    layout.append(line)
+                    continue
+                lead = line[:len(line) - len(line.lstrip())]
+                trail = line[len(line.rstrip()):]
+                indexes = []
+                for piece in self._split_line(content, max_bytes - 1):
+                    indexes.append(len(lines))
+                    lines.append(piece)
+                layout.append((lead, indexes, trail))
+            layouts.append(layout)
+
+        translated = [None] * len(lines)
+        for start, end in self._pack_lines(lines, max_bytes):
+            self._translate_lines(lines, start, end, from_lang, to_lang, translated)
+
+        joiner = '' if to_lang in NO_SPACE_LANGUAGES else ' '
+        results = []
+        for layout in layouts:
+            result_lines = []
+            for entry in layout:
+                if isinstance(entry, str):
+                    # 空行（或只有空白的行）原样保留
+                    result_lines.append(entry)
+                else:
+                    lead, indexes, trail = entry
+                    result_lines.append(lead + joiner.join(translated[i] for i in indexes) + trail)
+            results.append('\n'.join(result_lines))
+        return results
+
+    @staticmethod
+    def _split_line(line, max_bytes):
+        """
+        把UTF-8超过max_bytes的一行切成几段，只在字符边界切开（尽量在空白处）
+
+        Returns:
+            各段组成的列表，不超长时就是 [line]
+        """
+        data = line.encode('utf-8')
+        if len(data) <= max_bytes:
+            return [line]
+        pieces = []
+        while len(data) > max_bytes:
+            cut = max_bytes
+            # UTF-8的后续字节是 10xxxxxx，往前退到一个字符的开头
+            while cut > 0 and data[cut] & 0xC0 == 0x80:
+                cut -= 1
+            if cut == 0:
+                # max_bytes比一个字符还短，至少切出一个完整的字符
+                cut = 1
+                while cut < len(data) and data[cut] & 0xC0 == 0x80:
+                    cut += 1
+            space = data.rfind(b' ', max_bytes // 2, cut)
+            if space > 0:
+                cut = space + 1
+            piece = data[:cut].decode('utf-8').strip()
+            if piece:
+                pieces.append(piece)
+            data = data[cut:]
+        piece = data.decode('utf-8').strip()
+        if piece:
+            pieces.append(piece)
+        return pieces
+
+    @staticmethod
+    def _pack_lines(lines, max_bytes):
+        """把连续的行分组，每组拼接后的字节数不超过max_bytes，返回(start, end)列表"""
+        groups = []
+        start = 0
+        size = 0
+        for i, line in enumerate(lines):
+            line_bytes = len(line.encode('utf-8')) + 1  # 加上换行符
+            if i > start and size + line_bytes > max_bytes:
+                groups.append((start, i))
+                start = i
+                size = 0
+            size += line_bytes
+        if start < len(lines):
+            groups.append((start, len(lines)))
+        return groups
+
+    def _translate_lines(self, lines, start, end, from_lang, to_lang, translated):
+        """翻译lines[start:end]，结果写入translated对应的位置"""
+        result = self.request('\n'.join(lines[start:end]), from_lang, to_lang)
+        segments = result.get('trans_result', [])
+        if len(segments) == end - start:
+            for i, item in enumerate(segments):
+                translated[start + i] = item['dst']
+            return
+
+        # 返回的段数对不上（接口合并或拆分了某些行），退回逐行翻译
+        if end - start == 1:
+            translated[start] = '\n'.join(item['dst'] for item in segments)
+            return
+        for i in range(start, end):
+            self._translate_lines(lines, i, i + 1, from_lang, to_lang, translated)
@@ -0,0 +1,10 @@
+# 各个基准测试共用的统计函数
+
+def percentile(sorted_values, p):
+    """已排序列表的百分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
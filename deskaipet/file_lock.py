@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+class FileLock:
+    def __init__(self, lock_file, timeout=10.0, poll_interval=0.05):
+        """
+        跨进程的建议锁（Windows用msvcrt.locking，其它系统用fcntl.flock）
+
+        锁加在单独的锁文件上，不影响被保护的文件本身的读写和改名。
+        同一个进程里可以嵌套获取（用RLock保证线程之间也互斥），最外层释放时才释放文件锁。
+        进程退出（包括崩溃）时系统会自动释放锁
+
+        Args:
+            lock_file: 锁文件路径，不存在时自动创建
+            timeout: 等待锁的最长时间（秒），超时抛出TimeoutError
+            poll_interval: 锁被别的进程占用时重试的间隔（秒）
+        """
+        self.lock_file = lock_file
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        """获取锁，超时抛出TimeoutError"""
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"等待锁 {self.lock_file} 超时")
+        try:
+            if self._depth == 0:
+                self._lock_file()
+            self._depth += 1
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        """释放锁"""
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock_file()
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def _lock_file(self):
+        if self._fd is None:
+            self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"等待锁 {self.lock_file} 超时")
+            time.sleep(self.poll_interval)
+
+    def _try_lock(self):
+        """不等待地尝试加锁，返回是否成功"""
+        try:
+            if os.name == 'nt':
+                # msvcrt.locking 锁的是从当前位置开始的字节，统一锁第0个字节
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def _unlock_file(self):
+        if os.name == 'nt':
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        """关闭锁文件（不删除，删除会让别的进程锁在不同的文件上）"""
+        with self._thread_lock:
+            if self._fd is not None and self._depth == 0:
+                os.close(self._fd)
+                self._fd = None
@@ -1,22 +1,115 @@
 import tkinter as tk
 from tkinter import simpledialog
 import os
+import json
+import threading
+from notes_sqlite import SqliteNotesStore
+from path_watcher import PathWatcher, canonical_path
+from notes_io import open_text_store
+from fuzzy_index import FuzzyIndex
+from path_trie import PathTrie
 
 class FileNotesManager:
-    def __init__(self, pet_app):
+    def __init__(self, pet_app, backend=None):
         """
         文件注释管理器
         
         Args:
             pet_app: 主程序实例，用于访问动画和显示功能
+            backend: 注释的存储方式，"text" 为 folder_notes.txt，"sqlite" 为支持全文搜索的 folder_notes.db；
+                     None表示按配置文件 notes_config.json 里的 "backend"，没有配置时
+                     已经有 folder_notes.db 就用sqlite，否则用text
         """
         self.pet_app = pet_app
         self.notes_file = "folder_notes.txt"
+        self.db_file = "folder_notes.db"
+        self.config_file = "notes_config.json"
         
-        # 确保注释文件存在
-        if not os.path.exists(self.notes_file):
-            with open(self.notes_file, 'w', encoding='utf-8') as f:
-                f.write("")
+        if backend is None:
+            backend = self._load_backend()
+        if backend is None:
+            backend = "sqlite" if os.path.exists(self.db_file) else "text"
+        
+        if backend == "sqlite":
+            self.store = SqliteNotesStore(self.db_file)
+            self._migrate_text_notes()
+        else:
+            # 确保注释文件存在
+            if not os.path.exists(self.notes_file):
+                with open(self.notes_file, 'w', encoding='utf-8') as f:
+                    f.write("")
+            
+            # 注释只在启动时读一次，之后的查询和保存都走内存中的索引
+            # （aipartcode以前把JSON格式的注释存在同名文件里，打开时会自动迁移）
+            self.store = open_text_store(self.notes_file)
+        
+        # 以路径为键的注释在文件移动、改名后跟着走，文件删除后清理掉
+        store_file = self.db_file if backend == "sqlite" else self.notes_file
+        self.watcher = PathWatcher(self.store, store_file + ".ids").start()
+        
+        # 文件名的模糊索引（输错文件名时找最像的几个）和路径前缀树（查文件时找上级文件夹的注释），
+        # 注释很多时建索引要一点时间，放到后台
+        self.fuzzy_index = FuzzyIndex()
+        self.path_trie = PathTrie()
+        threading.Thread(target=self._build_indexes, daemon=True).start()
+
+    def _load_backend(self):
+        """从配置文件读取注释的存储方式，没有配置或配置无效时返回None"""
+        try:
+            if not os.path.exists(self.config_file):
+                return None
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                backend = json.load(f).get('backend')
+        except Exception as e:
+            print(f"加载注释配置文件失败了: {e}")
+            return None
+        if backend not in (None, "text", "sqlite"):
+            print(f"配置文件里的注释存储方式无效（只能是text或sqlite）: {backend}")
+            return None
+        return backend
+
+    def _migrate_text_notes(self):
+        """
+        第一次使用数据库时，把原来文本文件里的注释搬过来
+
+        是否已经迁移记在数据库里，而不是看数据库文件在不在：
+        数据库可能被别的程序先创建了，迁移也可能中途退出，没有完成时下次启动会重新迁移
+        """
+        state = self.store.get_meta('migrated_text')
+        if state == 'done':
+            return
+        if state is None and len(self.store):
+            # 以前的版本没有记录迁移状态，已经有注释的数据库当作迁移过了
+            self.store.set_meta('migrated_text', 'done')
+            return
+        if os.path.exists(self.notes_file):
+            self.store.set_meta('migrated_text', 'started')
+            text_store = open_text_store(self.notes_file)
+            try:
+                self.store.import_items(text_store.iter_items())
+            finally:
+                text_store.close()
+        self.store.set_meta('migrated_text', 'done')
+
+    def close(self):
+        """退出前关闭注释存储"""
+        self.watcher.stop()
+        self.store.close()
+
+    def _build_indexes(self):
+        """建立查询用的索引（后台线程）"""
+        self.path_trie.attach(self.store)
+        self.fuzzy_index.attach(self.store)
+
+    def _note_key(self, filename):
+        """
+        注释的键：输入的是存在的文件或文件夹时用它的规范化绝对路径，
+        这样文件移动或改名后注释还能找到；否则直接用输入的名字
+        """
+        filename = filename.strip()
+        if os.path.exists(os.path.expanduser(filename)):
+            return canonical_path(filename)
+        return filename
 
     def read_notes(self):
         """读取文件注释"""
@@ -38,25 +131,56 @@ class FileNotesManager:
     def _read_notes_from_file(self, filename):
         """从文件中读取注释"""
         try:
-            with open(self.notes_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            notes_found = False
-            for line in lines:
-                if line.strip():
-                    parts = line.strip().split('|')
-                    if len(parts) >= 2 and parts[0] == filename:
-                        note = parts[1]
-                        self.pet_app.show_message(f"文件 '{filename}' 的注释是:\n{note}", "talking1")
-                        notes_found = True
-                        break
-            
-            if not notes_found:
-                self.pet_app.show_message(f"没有找到文件 '{filename}' 的注释", "denying")
+            key = self._note_key(filename)
+            note = self.store.get(key)
+            if note is None:
+                # 以前按名字保存的注释
+                note = self.store.get(filename)
+            if note is not None:
+                self.pet_app.show_message(f"文件 '{filename}' 的注释是:\n{note}", "talking1")
+            elif not self._show_folder_notes(filename, key):
+                self._show_search_results(filename)
                 
         except Exception as e:
             self.pet_app.show_message(f"读取文件注释时出错:\n{str(e)}", "denying")
 
+    def _show_folder_notes(self, filename, key):
+        """
+        文件本身没有注释时，显示它所在的各级文件夹的注释（从外到内）
+
+        Returns:
+            是否找到了上级文件夹的注释
+        """
+        if not os.path.isabs(key):
+            return False
+        lines = []
+        for folder in self.path_trie.chain(key):
+            note = self.store.get(folder)
+            if note is not None:
+                lines.append(f"{folder}: {note}")
+        if not lines:
+            return False
+        message = f"文件 '{filename}' 没有单独的注释，它所在的文件夹的注释是:\n" + "\n".join(lines)
+        self.pet_app.show_message(message, "talking1")
+        return True
+
+    def _show_search_results(self, query, limit=5):
+        """找不到完全相同的文件名时，先找名字最像的文件（可能输错了），再按关键词搜索文件名和注释"""
+        results = []
+        for filename, score in self.fuzzy_index.search(query, limit):
+            note = self.store.get(filename)
+            if note is not None:
+                results.append((filename, note))
+        if not results and hasattr(self.store, 'search'):
+            results = self.store.search(query, limit)
+        if not results:
+            self.pet_app.show_message(f"没有找到文件 '{query}' 的注释", "denying")
+            return
+        
+        lines = [f"{filename}: {note}" for filename, note in results]
+        message = f"没有找到文件 '{query}'，你是不是要找:\n" + "\n".join(lines)
+        self.pet_app.show_message(message, "talking1")
+
     def add_notes(self):
         """添加文件注释"""
         # 显示提示消息
@@ -106,25 +230,8 @@ class FileNotesManager:
     def _save_note_to_file(self, filename, note, modify=False):
         """将注释保存到文件"""
         try:
-            # 读取现有注释
-            notes_dict = {}
-            if os.path.exists(self.notes_file):
-                with open(self.notes_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                
-                for line in lines:
-                    if line.strip():
-                        parts = line.strip().split('|')
-                        if len(parts) >= 2:
-                            notes_dict[parts[0]] = parts[1]
-            
-            # 更新或添加注释
-            notes_dict[filename] = note
-            
-            # 写回文件
-            with open(self.notes_file, 'w', encoding='utf-8') as f:
-                for fname, fnote in notes_dict.items():
-                    f.write(f"{fname}|{fnote}\n")
+            # 更新或添加注释（只在文件末尾追加一行）
+            self.store.set(self._note_key(filename), note)
             
             action = "修改" if modify else "添加"
             self.pet_app.show_message(f"成功{action}文件 '{filename}' 的注释", "talking1")
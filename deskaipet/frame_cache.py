@@ -0,0 +1,283 @@
+import hashlib
+import os
+import struct
+import time
+from PIL import Image
+
+# 缓存文件格式：文件头（魔数、宽、高、颜色模式、来源的长度），
+# 来源（UTF-8的 "图片路径|修改时间|文件大小"），后面直接是像素数据
+HEADER = struct.Struct('<4sHH4sH')
+MAGIC = b'PFC2'
+
+class FrameCache:
+    def __init__(self, cache_dir="frame_cache", resample=Image.Resampling.LANCZOS):
+        """
+        缩放好的表情帧的磁盘缓存
+
+        第一次使用某张图片时照常解码并缩放，再把缩放后的像素原样写进缓存文件；
+        以后启动时直接读像素，不用再解码PNG和做LANCZOS缩放。
+        缓存的键包含图片的路径、修改时间、文件大小和目标尺寸，图片被替换后自动失效。
+        缓存文件名以图片路径的哈希开头、文件头里记着来源，写新缓存时删掉同一张图片过时的缓存，
+        每个实例第一次写缓存时还会清理一遍整个目录（来源图片已经删除或改过的），缓存目录不会越来越大
+
+        Args:
+            cache_dir: 缓存目录
+            resample: 缩放算法
+        """
+        self.cache_dir = cache_dir
+        self.resample = resample
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+        self._swept = False
+        # 已经清理过的来源（同一个GIF的每一帧没命中时不用重复清理）
+        self._pruned_sources = set()
+
+    @staticmethod
+    def _source(path):
+        """
+        图片的来源标记 "路径|修改时间|文件大小"，图片被修改或替换后会改变
+
+        Returns:
+            来源标记，图片不存在时返回None
+        """
+        try:
+            result = os.stat(path)
+        except OSError:
+            return None
+        return f"{os.path.abspath(path)}|{result.st_mtime_ns}|{result.st_size}"
+
+    @staticmethod
+    def _prefix(path):
+        """同一张图片的所有缓存文件共用的文件名前缀"""
+        return hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16] + "-"
+
+    def cache_file(self, path, size, index=0, rect=None):
+        """
+        图片path（的第index帧或rect区域）缩放到size后的缓存文件路径
+
+        Returns:
+            缓存文件路径，图片不存在时返回None
+        """
+        source = self._source(path)
+        if source is None:
+            return None
+        return self._cache_file(path, source, size, index, rect)
+
+    def _cache_file(self, path, source, size, index=0, rect=None):
+        key = f"{source}|{size[0]}x{size[1]}"
+        if index:
+            key += f"|#{index}"
+        if rect:
+            key += "|@" + ",".join(str(value) for value in rect)
+        name = self._prefix(path) + hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + ".frame")
+
+    def load(self, path, size, index=0, rect=None):
+        """
+        读取缩放到size的图片，优先使用缓存
+
+        Args:
+            path: 图片路径
+            size: (宽, 高)
+            index: 动画GIF/APNG的第几帧
+            rect: 精灵图（sprite sheet）里的区域 (x, y, 宽, 高)
+
+        Returns:
+            PIL Image
+        """
+        source = self._source(path)
+        cache_file = None
+        if source is not None:
+            cache_file = self._cache_file(path, source, size, index, rect)
+            image = self._read(cache_file)
+            if image is not None:
+                self.hits += 1
+                return image
+        self.misses += 1
+        # 缩放得到的是新图片，关闭源文件不影响它
+        with Image.open(path) as opened:
+            if index:
+                opened.seek(index)
+            image = opened
+            if rect:
+                x, y, width, height = rect
+                image = image.crop((x, y, x + width, y + height))
+            image = self.scale(image, size)
+        if cache_file is not None:
+            self._write(cache_file, source, image)
+            if not self._swept:
+                # 第一次没命中（有图片是新的或者改过），顺便清理整个目录
+                self._swept = True
+                self.prune()
+            elif source not in self._pruned_sources:
+                self._prune_source(path, source)
+            self._pruned_sources.add(source)
+        return image
+
+    def scale(self, image, size):
+        """缩放图片（调色板图片先转成RGBA，LANCZOS缩放需要真彩色）"""
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+        return image.resize(size, self.resample)
+
+    @staticmethod
+    def _read(cache_file):
+        """读取缓存文件，不存在或损坏时返回None"""
+        try:
+            with open(cache_file, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, width, height, mode, source_length = HEADER.unpack_from(data)
+        mode = mode.decode('ascii').strip()
+        offset = HEADER.size + source_length
+        if magic != MAGIC or len(data) - offset != width * height * len(mode):
+            return None
+        return Image.frombytes(mode, (width, height), data[offset:])
+
+    @staticmethod
+    def _read_source(cache_file):
+        """只读缓存文件的来源标记，不是当前格式或者损坏时返回None"""
+        try:
+            with open(cache_file, 'rb') as f:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return None
+                magic, _, _, _, source_length = HEADER.unpack(header)
+                if magic != MAGIC:
+                    return None
+                return f.read(source_length).decode('utf-8')
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _write(self, cache_file, source, image):
+        """写缓存文件（先写临时文件再改名，写到一半退出也不会留下损坏的缓存）"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            source = source.encode('utf-8')
+            header = HEADER.pack(MAGIC, image.width, image.height, image.mode.ljust(4).encode('ascii'), len(source))
+            temp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(header)
+                f.write(source)
+                f.write(image.tobytes())
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            print(f"写入表情缓存失败: {e}")
+
+    def _remove(self, cache_file):
+        try:
+            os.remove(cache_file)
+            self.pruned += 1
+        except OSError as e:
+            print(f"删除过时的表情缓存失败: {e}")
+
+    def _prune_source(self, path, source):
+        """删除图片path过时的缓存（来源标记和现在的不一样的）"""
+        prefix = self._prefix(path)
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(prefix) and name.endswith(".frame"):
+                cache_file = os.path.join(self.cache_dir, name)
+                if self._read_source(cache_file) != source:
+                    self._remove(cache_file)
+
+    def prune(self):
+        """
+        清理整个缓存目录：删除来源图片已经删除或改过的缓存，以及旧格式和损坏的缓存
+
+        Returns:
+            删除的文件数
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        before = self.pruned
+        # 每张图片只stat一次
+        current = {}
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".frame"):
+                continue
+            cache_file = os.path.join(self.cache_dir, name)
+            source = self._read_source(cache_file)
+            if source is not None:
+                path = source.rsplit('|', 2)[0]
+                if path not in current:
+                    current[path] = self._source(path)
+                if current[path] == source:
+                    continue
+            self._remove(cache_file)
+        return self.pruned - before
+
+    def clear(self):
+        """删除所有缓存文件"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".frame"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+def main():
+    # 基准测试：冷启动（没有缓存，解码+缩放+写缓存）和热启动（读缓存）加载一组表情的耗时
+    import argparse
+    import glob
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="表情帧缓存的冷/热启动基准测试")
+    parser.add_argument('images', nargs='*', help="表情图片，默认用当前目录的 face*.png")
+    parser.add_argument('--size', type=int, default=80, help="缩放后的边长")
+    parser.add_argument('--copies', type=int, default=10, help="每张图片当成几张不同的图片加载（模拟更多的表情）")
+    parser.add_argument('--repeat', type=int, default=5, help="重复次数，取中位数")
+    args = parser.parse_args()
+
+    images = args.images or sorted(glob.glob("face*.png"))
+    if not images:
+        print("没有找到表情图片")
+        return
+    size = (args.size, args.size)
+    with tempfile.TemporaryDirectory() as directory:
+        # 复制成不同的文件，缓存按路径区分
+        paths = []
+        for i in range(args.copies):
+            for image in images:
+                path = os.path.join(directory, f"{i}_{os.path.basename(image)}")
+                with open(image, 'rb') as source, open(path, 'wb') as target:
+                    target.write(source.read())
+                paths.append(path)
+
+        def startup(cache):
+            start = time.perf_counter()
+            for path in paths:
+                cache.load(path, size)
+            return (time.perf_counter() - start) * 1000
+
+        def uncached():
+            # 原来的方式：每次都解码并缩放
+            start = time.perf_counter()
+            for path in paths:
+                with Image.open(path) as image:
+                    cache.scale(image, size)
+            return (time.perf_counter() - start) * 1000
+
+        cold = []
+        warm = []
+        for i in range(args.repeat):
+            cache = FrameCache(os.path.join(directory, f"cache_{i}"))
+            cold.append(startup(cache))
+            warm.append(startup(FrameCache(cache.cache_dir)))
+        original = sorted(uncached() for _ in range(args.repeat))
+        cold.sort()
+        warm.sort()
+        middle = args.repeat // 2
+        print(f"{len(paths)} 张图片缩放到 {args.size}x{args.size}")
+        print(f"不用缓存:          {original[middle]:8.2f}ms")
+        print(f"冷启动（写缓存）:  {cold[middle]:8.2f}ms")
+        print(f"热启动（读缓存）:  {warm[middle]:8.2f}ms  快 {original[middle] / warm[middle]:.1f} 倍")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+from collections import OrderedDict
+from PIL import Image, ImageTk
+
+class FrameStore:
+    def __init__(self, frames, frame_cache, size=(80, 80), capacity=64):
+        """
+        按需解码的表情帧，最近用过的capacity帧保留为PhotoImage
+
+        启动时不解码任何图片，某一帧第一次显示时才（通过磁盘缓存）解码并创建PhotoImage。
+        超过capacity帧时丢掉最久没用的，帧很多的角色包也不会让启动变慢、内存一直涨。
+        正在显示的那一帧由显示它的一方持有引用，被丢掉后也不会从界面上消失
+
+        Args:
+            frames: {帧名称: {"file", "index", "rect", "color"}}，见 load_animations
+            frame_cache: FrameCache
+            size: 帧的大小
+            capacity: 最多保留的PhotoImage数
+        """
+        self.frames = frames
+        self.frame_cache = frame_cache
+        self.size = size
+        self.capacity = capacity
+        self._images = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, name):
+        return name in self.frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    def keys(self):
+        return self.frames.keys()
+
+    def get(self, name):
+        """
+        取一帧的PhotoImage，没有这一帧时返回None
+        """
+        image = self._images.get(name)
+        if image is not None:
+            self._images.move_to_end(name)
+            self.hits += 1
+            return image
+        frame = self.frames.get(name)
+        if frame is None:
+            return None
+        self.misses += 1
+        image = ImageTk.PhotoImage(self._decode(name, frame))
+        self._images[name] = image
+        if len(self._images) > self.capacity:
+            self._images.popitem(last=False)
+            self.evictions += 1
+        return image
+
+    def _decode(self, name, frame):
+        """读取一帧（优先用磁盘缓存），图片不存在或读取失败时用纯色图片代替"""
+        file_path = frame.get('file')
+        if file_path and os.path.exists(file_path):
+            try:
+                return self.frame_cache.load(file_path, self.size, frame.get('index', 0), frame.get('rect'))
+            except Exception as e:
+                print(f"加载表情图片失败: {e}")
+        elif file_path:
+            print(f"创建默认表情图片: {name}")
+        return Image.new('RGB', self.size, color=frame.get('color', 'lightblue'))
+
+    def loaded(self):
+        """当前保留着的PhotoImage数"""
+        return len(self._images)
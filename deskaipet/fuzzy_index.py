@@ -0,0 +1,181 @@
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+# 路径按 / 和 \ 切开，只用最后一段（文件名）建索引，否则相同的上级目录会让所有路径都很"像"
+PATH_SEPARATOR = re.compile(r'[\\/]')
+
+def _index_text(key):
+    """建索引用的文本：路径的最后一段，统一小写"""
+    name = PATH_SEPARATOR.split(key.rstrip('\\/'))[-1] or key
+    return name.lower()
+
+def trigrams(text):
+    """文本的三字母组集合（前后各补空格，短文本也有三字母组）"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a, b):
+    """两个三字母组集合的Dice相似度，0~1"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+class FuzzyIndex:
+    def __init__(self, max_posting_ratio=0.05, min_similarity=0.3, max_grams=6):
+        """
+        注释键（文件名）的三字母组模糊索引
+
+        每个三字母组记下包含它的键。查询时只用输入里最少见的几个三字母组找候选
+        （和输入至少共有其中两个的键），再对候选精确计算相似度。
+        像 ".tx"、"txt" 这种几乎每个键都有的三字母组不参与找候选（只在最后算相似度时用），
+        所以查询只会碰到很少的键
+
+        Args:
+            max_posting_ratio: 包含某个三字母组的键超过总数的这个比例时，不用它找候选
+            min_similarity: 相似度低于这个值的结果不返回
+            max_grams: 找候选时最多使用的三字母组个数
+        """
+        self.max_posting_ratio = max_posting_ratio
+        self.min_similarity = min_similarity
+        self.max_grams = max_grams
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._ids = {}
+        self._keys = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, key):
+        """添加一个键（已经存在时什么也不做）"""
+        with self._lock:
+            if key in self._ids:
+                return
+            key_id = self._next_id
+            self._next_id += 1
+            self._ids[key] = key_id
+            self._keys[key_id] = key
+            for gram in trigrams(_index_text(key)):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    self._postings[gram] = {key_id}
+                else:
+                    posting.add(key_id)
+
+    def remove(self, key):
+        """删除一个键"""
+        with self._lock:
+            key_id = self._ids.pop(key, None)
+            if key_id is None:
+                return
+            del self._keys[key_id]
+            for gram in trigrams(_index_text(key)):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(key_id)
+                    if not posting:
+                        del self._postings[gram]
+
+    def build(self, keys):
+        """批量添加键"""
+        for key in keys:
+            self.add(key)
+
+    def attach(self, store):
+        """用store里现有的键建索引，之后随注释的增删改名自动更新"""
+        store.add_listener(self._on_store_change)
+        self.build(filename for filename, note in store.items())
+        return self
+
+    def _on_store_change(self, op, filename, value):
+        """注释变化的回调"""
+        if op == 'set':
+            self.add(filename)
+        elif op == 'delete':
+            self.remove(filename)
+        elif op == 'rename':
+            self.remove(filename)
+            self.add(value)
+
+    def search(self, query, limit=5, candidates=20):
+        """
+        找和query最像的键
+
+        Args:
+            query: 输入的文件名（可以有错字）
+            limit: 最多返回的结果数
+            candidates: 精确计算相似度的候选数
+
+        Returns:
+            按相似度从高到低排序的 [(键, 相似度)] 列表
+        """
+        text = _index_text(query.strip())
+        query_grams = trigrams(text)
+        with self._lock:
+            max_posting = max(int(len(self._ids) * self.max_posting_ratio), 100)
+            # 从小到大排序，只用少见的三字母组；少见的不到两个时只用最小的两个
+            postings = sorted(
+                (self._postings[gram] for gram in query_grams if gram in self._postings), key=len
+            )
+            rare = [posting for posting in postings if len(posting) <= max_posting][:self.max_grams]
+            if len(rare) < 2:
+                rare = postings[:2]
+            # 和输入至少共有两个少见三字母组的键（集合求交在C里完成，比逐个计数快得多）
+            found = set()
+            for i in range(len(rare)):
+                for j in range(i + 1, len(rare)):
+                    found |= rare[i] & rare[j]
+            if not found and rare:
+                found = set(rare[0])
+            if len(found) > candidates:
+                counts = Counter()
+                for posting in rare:
+                    counts.update(found & posting)
+                found = [key_id for key_id, _ in counts.most_common(candidates)]
+            found = [self._keys[key_id] for key_id in found]
+
+        scored = []
+        for key in found:
+            score = similarity(query_grams, trigrams(_index_text(key)))
+            if score >= self.min_similarity:
+                scored.append((key, score))
+        scored.sort(key=lambda item: -item[1])
+        return scored[:limit]
+
+def main():
+    # 基准测试：10万个文件名，查询带错字的文件名
+    rng = random.Random(0)
+    words = ["report", "invoice", "summary", "draft", "budget", "photo", "notes", "meeting",
+             "project", "design", "final", "backup", "data", "plan", "review", "contract"]
+    exts = [".txt", ".docx", ".xlsx", ".pdf", ".png", ".py", ".md"]
+    keys = [
+        f"/home/user/dir{i // 1000}/{rng.choice(words)}_{rng.choice(words)}_{i}{rng.choice(exts)}"
+        for i in range(100000)
+    ]
+
+    start = time.perf_counter()
+    index = FuzzyIndex()
+    index.build(keys)
+    print(f"建索引: {len(index)} 个键, {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def typo(name):
+        i = rng.randrange(len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+    targets = rng.sample(keys, 200)
+    queries = [typo(key.rsplit('/', 1)[1]) for key in targets]
+    start = time.perf_counter()
+    results = [index.search(query) for query in queries]
+    elapsed = time.perf_counter() - start
+    hits = sum(any(key == target for key, score in result) for result, target in zip(results, targets))
+    for query, result in list(zip(queries, results))[:3]:
+        print(query, "->", result[:3])
+    print(f"前5个结果里有原文件名: {hits}/{len(queries)}")
+    print(f"平均查询: {elapsed * 1000 / len(queries):.3f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import timeit
+
+# 按UTF-16高字节（每256个码位为一块）划分文字，预先编译成字节翻译表：
+# h: 汉字  k: 假名、谚文兼容字母和CJK标点等混在一起的块（U+30xx、U+31xx，之后精确统计）
+# g: 谚文  c: 西里尔字母
+SCRIPT_BLOCKS = {
+    'h': list(range(0x34, 0xA0)) + [0xF9, 0xFA],
+    'k': [0x30, 0x31],
+    'g': [0x11] + list(range(0xAC, 0xD8)),
+    'c': [0x04],
+}
+BLOCK_TABLE = bytearray(b'.' * 256)
+for _code, _blocks in SCRIPT_BLOCKS.items():
+    for _block in _blocks:
+        BLOCK_TABLE[_block] = ord(_code)
+BLOCK_TABLE = bytes(BLOCK_TABLE)
+
+# 拉丁字母：Latin-1 编码后只保留 A-Z a-z 和带重音的字母
+LATIN_DELETE = bytes(
+    b for b in range(256)
+    if not (0x41 <= b <= 0x5A or 0x61 <= b <= 0x7A or (0xC0 <= b <= 0xFF and b not in (0xD7, 0xF7)))
+)
+
+# U+30xx、U+31xx 块里的文字：
+#   假名：平假名、片假名（U+3040-30FF）和片假名音标扩展（U+31F0-31FF），
+#         不含CJK符号和标点（U+3000-303F，中文也用，例如〇〖〗〝〞）
+#   谚文兼容字母（U+3130-318F，例如ㅋㅋ）
+# 高字节和低字节分别翻译成位掩码，两者按位与之后：1、2是假名，4是谚文兼容字母
+SHARED_HIGH_TABLE = bytes(1 if b == 0x30 else 6 if b == 0x31 else 0 for b in range(256))
+SHARED_LOW_TABLE = bytes(
+    (1 if b >= 0x40 else 0) | (2 if b >= 0xF0 else 0) | (4 if 0x30 <= b <= 0x8F else 0)
+    for b in range(256)
+)
+
+# 百度翻译的语言代码对应的中文名称
+LANGUAGE_NAMES = {
+    'zh': "中文",
+    'en': "英文",
+    'jp': "日文",
+    'kor': "韩文",
+    'ru': "俄文",
+}
+
+# 超长文本只统计开头这么多字符，足够判断语言
+MAX_SAMPLE_CHARS = 65536
+
+# 一个汉字大约相当于一个英文单词，比较主要文字时给汉字加权
+HAN_WEIGHT = 4
+
+# 假名占（假名+汉字）的比例达到这个值才算日文；日文里假名一般占一半左右，
+# 中文里偶尔夹一两个假名（例如注音、店名）不会到这个比例
+KANA_RATIO = 0.2
+
+# 先只统计开头这么多字符，结果足够明确就不再看后面的内容
+EARLY_SAMPLE_CHARS = 256
+
+# 提前结束需要的最少文字字符数，以及第一名的权重至少是第二名的几倍
+EARLY_MIN_LETTERS = 32
+EARLY_MARGIN = 2
+
+def script_counts(text, max_chars=MAX_SAMPLE_CHARS):
+    """
+    统计各种文字的字符数
+
+    全部计数都在字节层面由C代码完成（encode/translate/count），不逐字符循环
+
+    Returns:
+        {'han': 汉字数, 'kana': 假名数, 'hangul': 谚文数, 'latin': 拉丁字母数, 'cyrillic': 西里尔字母数}
+    """
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars]
+
+    latin_bytes = text.encode('latin-1', 'ignore')
+    counts = {
+        'han': 0,
+        'kana': 0,
+        'hangul': 0,
+        'latin': len(latin_bytes.translate(None, LATIN_DELETE)),
+        'cyrillic': 0,
+    }
+    # 纯ASCII文本只可能有拉丁字母（isascii不需要扫描字符串）
+    if text.isascii():
+        return counts
+
+    encoded = text.encode('utf-16-be', 'surrogatepass')
+    high = encoded[0::2]
+    blocks = high.translate(BLOCK_TABLE)
+    counts['han'] = blocks.count(b'h')
+    counts['hangul'] = blocks.count(b'g')
+    counts['cyrillic'] = blocks.count(b'c')
+    if b'k' in blocks:
+        shared = (int.from_bytes(high.translate(SHARED_HIGH_TABLE), 'big')
+                  & int.from_bytes(encoded[1::2].translate(SHARED_LOW_TABLE), 'big'))
+        shared = shared.to_bytes(len(high), 'big')
+        counts['kana'] = shared.count(1) + shared.count(2)
+        counts['hangul'] += shared.count(4)
+    return counts
+
+def script_ratios(text, max_chars=MAX_SAMPLE_CHARS):
+    """
+    各种文字占所有文字字符（不含空白、数字和标点）的比例
+
+    Returns:
+        {'han': 0.8, 'kana': 0.0, ...}，文本里没有文字时全部为0
+    """
+    counts = script_counts(text, max_chars)
+    total = sum(counts.values())
+    return {script: (count / total if total else 0.0) for script, count in counts.items()}
+
+def _weigh(counts):
+    """
+    按文字的计数给每种语言打分
+
+    假名占（假名+汉字）的比例达到 KANA_RATIO 时汉字算作日文，否则假名忽略不计，汉字算作中文
+
+    Returns:
+        {语言代码: 分数}
+    """
+    han = counts['han']
+    kana = counts['kana']
+    weighted = {
+        'zh': han * HAN_WEIGHT,
+        'jp': 0,
+        'kor': counts['hangul'] * HAN_WEIGHT,
+        'en': counts['latin'],
+        'ru': counts['cyrillic'],
+    }
+    if kana and kana >= (kana + han) * KANA_RATIO:
+        weighted['jp'] = (kana + han) * HAN_WEIGHT
+        weighted['zh'] = 0
+    return weighted
+
+def detect_language(text, max_chars=MAX_SAMPLE_CHARS):
+    """
+    检测文本语言
+
+    先只看开头 EARLY_SAMPLE_CHARS 个字符，文字足够多、第一名明显领先时直接返回，
+    否则再统计最多 max_chars 个字符
+
+    Returns:
+        百度翻译的语言代码：'zh'、'en'、'jp'、'kor' 或 'ru'
+    """
+    if max_chars and max_chars > EARLY_SAMPLE_CHARS and len(text) > EARLY_SAMPLE_CHARS:
+        counts = script_counts(text, EARLY_SAMPLE_CHARS)
+        if sum(counts.values()) >= EARLY_MIN_LETTERS:
+            weighted = _weigh(counts)
+            first, second = sorted(weighted.values(), reverse=True)[:2]
+            if first >= second * EARLY_MARGIN:
+                return max(weighted, key=weighted.get)
+
+    weighted = _weigh(script_counts(text, max_chars))
+    language = max(weighted, key=weighted.get)
+    # 没有任何文字（纯数字或符号）时按英文处理
+    return language if weighted[language] else 'en'
+
+def choose_language_pair(text, native='zh', foreign='en'):
+    """
+    选择翻译的源语言和目标语言：母语翻译成外语，其它语言都翻译成母语
+
+    Returns:
+        (from_lang, to_lang)
+    """
+    from_lang = detect_language(text)
+    to_lang = foreign if from_lang == native else native
+    return from_lang, to_lang
+
+def _legacy_detect_language(text):
+    """原来的逐字符检测，只用于性能对比"""
+    for char in text:
+        if '一' <= char <= '鿿':
+            return 'zh'
+    return 'en'
+
+def main():
+    # 微基准测试：几KB到几百KB的文本，比较逐字符循环和按码位块统计
+    samples = {
+        "英文 4KB": "The quick brown fox jumps over the lazy dog. " * 90,
+        "英文 64KB": "The quick brown fox jumps over the lazy dog. " * 1450,
+        "英文+末尾中文 64KB": "The quick brown fox jumps over the lazy dog. " * 1450 + "你好",
+        "中文 16KB": "敏捷的棕色狐狸跳过了懒狗。" * 420,
+        "日文 8KB": "すばやい茶色の狐がのろまな犬を飛び越える。" * 130,
+    }
+    for name, text in samples.items():
+        number = 200
+        legacy = timeit.timeit(lambda: _legacy_detect_language(text), number=number) / number
+        current = timeit.timeit(lambda: detect_language(text), number=number) / number
+        print(f"{name:<20} 逐字符: {legacy * 1e6:9.1f}us ({_legacy_detect_language(text)})"
+              f"  码位统计: {current * 1e6:9.1f}us ({detect_language(text)})"
+              f"  x{legacy / current:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,11 @@ import time
 import threading
 import json
 import os
-from PIL import Image, ImageTk
 import requests
 import hashlib
 import uuid
 from animation_manager import PetAnimation  # 导入动画管理类
+from animation_scheduler import VisibilityGovernor
 from textanimate import TextAnimation  # 导入文字动画类
 
 
@@ -32,6 +32,8 @@ class DeskAipet:
         
         # 初始化动画管理器
         self.animation_manager = PetAnimation(self.pet_label)
+        # 窗口隐藏或最小化时暂停动画
+        self.visibility_governor = VisibilityGovernor(self.root, self.animation_manager.scheduler)
         
         # 初始化文字动画
         # 注意：将"typewriter.mp3"替换为你的音效文件路径
@@ -110,18 +112,11 @@ class DeskAipet:
         self.expand_button.pack(side='right', padx=5)
 
     def start_idle_animation(self):
-        """开始待机动画循环"""
-        def idle_loop():
-            print("待机动画线程启动")
-            while True:
-                # 播放待机动画10秒
-                print("播放待机动画")
-                self.animation_manager.play_idle_animation(10)
-                time.sleep(10)  # 等待动画完成
-                
-        # 启动待机动画循环线程
-        idle_thread = threading.Thread(target=idle_loop, daemon=True)
-        idle_thread.start()
+        """开始待机动画"""
+        # 待机动画是动画定义里的默认动画，其它动画结束后会自动回到它；
+        # 它只有一帧，不需要定时器，空闲时没有任何唤醒
+        if not self.animation_manager.is_animation_playing():
+            self.animation_manager.play_default_animation()
 
     def create_gui(self):
         """创建GUI界面"""
@@ -130,8 +125,8 @@ class DeskAipet:
         self.main_frame.pack(padx=5, pady=5)
         
         # 宠物头像 - 使用默认关闭表情
-        default_image = Image.new('RGB', (80, 80), color='lightblue')
-        self.default_photo = ImageTk.PhotoImage(default_image)
+        # 只是占位（透明，露出浅蓝色背景），动画管理器加载完表情后会换成真正的表情图片
+        self.default_photo = tk.PhotoImage(width=80, height=80)
         self.pet_label = tk.Label(self.main_frame, image=self.default_photo, bg='lightblue')
         self.pet_label.pack(pady=5)
         
@@ -4,17 +4,20 @@ import time
 import threading
 import json
 import os
-from PIL import Image, ImageTk
 import requests
 import hashlib
 import uuid
 from animation_manager import PetAnimation  # 导入动画管理类
+from animation_scheduler import VisibilityGovernor
 from textanimate import TextAnimation  # 导入文字动画类
 from file_notes_manager import FileNotesManager  # 导入文件注释管理类
 from translation_manager import TranslationManager  # 导入翻译管理类
 
 
 class DeskAipet:
+    # 流式消息最多保留的字符数，超出后丢弃最早的内容，长文本也不会占用越来越多的内存
+    STREAM_TEXT_LIMIT = 20000
+
     def __init__(self, root):
         self.root = root
         self.root.title("桌面宠物")
@@ -31,6 +34,8 @@ class DeskAipet:
         
         # 初始化动画管理器
         self.animation_manager = PetAnimation(self.pet_label)
+        # 窗口隐藏或最小化时暂停动画
+        self.visibility_governor = VisibilityGovernor(self.root, self.animation_manager.scheduler)
         
         # 初始化文字动画
         sound_file = "typewriter.mp3"  
@@ -100,16 +105,11 @@ class DeskAipet:
         self.expand_button.pack(side='right', padx=5)
 
     def start_idle_animation(self):
-        """开始待机动画循环"""
-        def idle_loop():
-            while True:
-                # 播放待机动画10秒
-                self.animation_manager.play_idle_animation(10)
-                time.sleep(10)  
-                
-        # 启动待机动画循环线程
-        idle_thread = threading.Thread(target=idle_loop, daemon=True)
-        idle_thread.start()
+        """开始待机动画"""
+        # 待机动画是动画定义里的默认动画，其它动画结束后会自动回到它；
+        # 它只有一帧，不需要定时器，空闲时没有任何唤醒
+        if not self.animation_manager.is_animation_playing():
+            self.animation_manager.play_default_animation()
 
     def create_gui(self):
         """创建GUI界面"""
@@ -118,8 +118,8 @@ class DeskAipet:
         self.main_frame.pack(padx=5, pady=5)
         
         # 宠物头像 - 使用默认关闭表情
-        default_image = Image.new('RGB', (80, 80), color='lightblue')
-        self.default_photo = ImageTk.PhotoImage(default_image)
+        # 只是占位（透明，露出浅蓝色背景），动画管理器加载完表情后会换成真正的表情图片
+        self.default_photo = tk.PhotoImage(width=80, height=80)
         self.pet_label = tk.Label(self.main_frame, image=self.default_photo, bg='lightblue')
         self.pet_label.pack(pady=5)
         
@@ -154,7 +154,7 @@ class DeskAipet:
         
         # 关闭按钮
         self.close_btn = tk.Button(self.function_frame, text="关闭", 
-                                  command=self.root.quit, bg='pink')
+                                  command=self.close, bg='pink')
         self.close_btn.pack(fill='x', padx=2, pady=2)
         
         # 绑定拖动事件
@@ -165,12 +165,19 @@ class DeskAipet:
         # 初始位置
         self.root.geometry("+100+100")
 
+    def close(self):
+        """关闭桌面宠物"""
+        # 取消还在进行的翻译请求，释放后台线程
+        self.translation_manager.close()
+        self.file_notes_manager.close()
+        self.root.quit()
+
     def show_function_menu(self):
         """显示功能菜单"""
         # 创建功能菜单窗口
         self.menu_window = tk.Toplevel(self.root)
         self.menu_window.title("功能菜单")
-        self.menu_window.geometry("200x150")
+        self.menu_window.geometry("200x225")
         self.menu_window.attributes('-topmost', True)  # 菜单置顶
         self.menu_window.resizable(False, False)
         
@@ -196,6 +203,14 @@ class DeskAipet:
                                  command=self.translate_text, width=20)
         translate_btn.pack(pady=5)
         
+        translate_file_btn = tk.Button(self.menu_window, text="5. 翻译文件", 
+                                      command=self.translate_file, width=20)
+        translate_file_btn.pack(pady=5)
+        
+        cancel_translate_btn = tk.Button(self.menu_window, text="6. 取消翻译", 
+                                        command=self.cancel_translation, width=20)
+        cancel_translate_btn.pack(pady=5)
+        
         # 绑定关闭事件
         self.menu_window.protocol("WM_DELETE_WINDOW", self.menu_window.destroy)
 
@@ -237,6 +252,18 @@ class DeskAipet:
             self.menu_window.destroy()
         self.translation_manager.translate()
 
+    def translate_file(self):
+        """翻译文本文件"""
+        if hasattr(self, 'menu_window'):
+            self.menu_window.destroy()
+        self.translation_manager.translate_file()
+
+    def cancel_translation(self):
+        """取消正在进行的翻译（包括文件的流式翻译）"""
+        if hasattr(self, 'menu_window'):
+            self.menu_window.destroy()
+        self.translation_manager.cancel_translation()
+
     def show_full_text(self):
         """显示完整文本的弹窗"""
         # 创建弹窗
@@ -282,6 +309,7 @@ class DeskAipet:
         # 插入完整文本
         full_text_widget.insert('1.0', self.current_full_text)
         full_text_widget.config(state='disabled')  # 设置为只读
+        self.full_text_widget = full_text_widget  # 流式消息会继续往里追加
         
         # 绑定关闭事件
         self.full_text_window.protocol("WM_DELETE_WINDOW", self.full_text_window.destroy)
@@ -330,6 +358,50 @@ class DeskAipet:
             self.animation_manager.play_denying_animation(duration)
 
 
+    def begin_stream_message(self, header, animation_type="talking2"):
+        """开始显示流式消息（内容会陆续通过append_stream_message追加）"""
+        self.text_animator.stop()
+        self.current_full_text = header
+        
+        for widget in self._stream_widgets():
+            widget.config(state='normal')
+            widget.delete('1.0', tk.END)
+            widget.insert('1.0', header)
+            widget.config(state='disabled')
+        
+        # 流式内容通常很长，直接显示扩展按钮方便查看完整内容
+        self.expand_button.pack(side='right', padx=5)
+        
+        if animation_type == "talking2":
+            self.animation_manager.play_talking_animation2(1)
+        else:
+            self.animation_manager.play_talking_animation1(1)
+
+    def append_stream_message(self, text):
+        """向流式消息追加内容，同时更新对话框和完整内容窗口"""
+        self.current_full_text = (self.current_full_text + text)[-self.STREAM_TEXT_LIMIT:]
+        
+        for widget in self._stream_widgets():
+            widget.config(state='normal')
+            widget.insert(tk.END, text)
+            # 只保留最后STREAM_TEXT_LIMIT个字符
+            overflow = len(widget.get('1.0', 'end-1c')) - self.STREAM_TEXT_LIMIT
+            if overflow > 0:
+                widget.delete('1.0', f'1.0+{overflow}c')
+            widget.see(tk.END)
+            widget.config(state='disabled')
+        
+        self.animation_manager.play_talking_animation2(1)
+
+    def _stream_widgets(self):
+        """需要显示流式消息的文本控件"""
+        widgets = [self.dialog_text]
+        full_text_widget = getattr(self, 'full_text_widget', None)
+        if full_text_widget is not None and full_text_widget.winfo_exists():
+            widgets.append(full_text_widget)
+        return widgets
+
+
 def main():
     root = tk.Tk()
     pet = DeskAipet(root)
@@ -0,0 +1,144 @@
+import argparse
+import ctypes
+import os
+import sys
+import time
+import tkinter as tk
+import tracemalloc
+
+def rss_bytes():
+    """
+    当前进程的常驻内存（RSS）
+
+    Windows用 GetProcessMemoryInfo，Linux读 /proc/self/statm，都不需要额外安装包；
+    其它系统只能拿到峰值（ru_maxrss）
+
+    Returns:
+        字节数
+    """
+    if os.name == 'nt':
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ('cb', ctypes.c_ulong),
+                ('PageFaultCount', ctypes.c_ulong),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+    if os.path.exists('/proc/self/statm'):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def slope(samples):
+    """最小二乘拟合 (秒, 字节) 样本的斜率，返回每小时增长的字节数"""
+    if len(samples) < 2:
+        return 0.0
+    count = len(samples)
+    mean_t = sum(t for t, _ in samples) / count
+    mean_v = sum(v for _, v in samples) / count
+    denominator = sum((t - mean_t) ** 2 for t, _ in samples)
+    if denominator == 0:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / denominator * 3600
+
+def create_app(name, root):
+    """创建要检查的桌宠"""
+    if name == 'aipartcode':
+        from aipartcode import DesktopPet
+        return DesktopPet(root)
+    if name == 'main_edit':
+        from main_edit import DeskAipet
+        return DeskAipet(root)
+    from main_edit1 import DeskAipet
+    return DeskAipet(root)
+
+def verdict(rss_samples, python_samples, max_rss_growth, max_python_growth):
+    """
+    判断内存是否是平的
+
+    Args:
+        rss_samples / python_samples: 启动稳定之后的 (秒, 字节) 样本
+        max_rss_growth: RSS每小时最多增长多少MB
+        max_python_growth: Python分配的内存每小时最多增长多少KB
+
+    Returns:
+        (是否通过, 说明)
+    """
+    if len(rss_samples) < 3:
+        return False, f"启动稳定之后只有 {len(rss_samples)} 个样本，运行时间太短，无法判断"
+    rss_growth = slope(rss_samples) / 1048576
+    python_growth = slope(python_samples) / 1024
+    problems = []
+    if rss_growth > max_rss_growth:
+        problems.append(f"RSS每小时增长 {rss_growth:+.2f}MB，超过 {max_rss_growth}MB")
+    if python_growth > max_python_growth:
+        problems.append(f"Python分配的内存每小时增长 {python_growth:+.1f}KB，超过 {max_python_growth}KB")
+    if problems:
+        return False, "；".join(problems)
+    return True, f"RSS每小时 {rss_growth:+.2f}MB，Python分配每小时 {python_growth:+.1f}KB"
+
+def main():
+    # 长时间运行的内存检查：桌宠正常运行，定时记录RSS和Python分配的内存，
+    # 启动稳定后两者都应该是平的（每小时增长接近0），超过阈值时以状态码1退出
+    parser = argparse.ArgumentParser(description="桌宠长时间运行的内存检查")
+    parser.add_argument('--app', choices=('aipartcode', 'main_edit', 'main_edit1'), default='aipartcode',
+                        help="要检查的桌宠")
+    parser.add_argument('--minutes', type=float, default=30, help="运行时长（分钟）")
+    parser.add_argument('--interval', type=float, default=10, help="采样间隔（秒）")
+    parser.add_argument('--warmup', type=float, default=30, help="不计入统计的启动时间（秒）")
+    parser.add_argument('--max-rss-growth', type=float, default=2.0, help="RSS每小时最多增长多少MB")
+    parser.add_argument('--max-python-growth', type=float, default=256.0,
+                        help="Python分配的内存每小时最多增长多少KB")
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        # 没有图形界面（例如没有显示器的服务器），无法运行桌宠
+        print(f"无法创建窗口: {e}")
+        sys.exit(2)
+    app = create_app(args.app, root)
+    tracemalloc.start()
+    start = time.perf_counter()
+    rss_samples = []
+    python_samples = []
+
+    def sample():
+        elapsed = time.perf_counter() - start
+        rss = rss_bytes()
+        python = tracemalloc.get_traced_memory()[0]
+        print(f"{elapsed:8.0f}s  RSS: {rss / 1048576:8.2f}MB  Python分配: {python / 1024:10.1f}KB")
+        if elapsed >= args.warmup:
+            rss_samples.append((elapsed, rss))
+            python_samples.append((elapsed, python))
+        if elapsed >= args.minutes * 60:
+            root.destroy()
+            return
+        root.after(int(args.interval * 1000), sample)
+
+    root.after(int(args.interval * 1000), sample)
+    root.mainloop()
+
+    del app
+    if rss_samples:
+        first, last = rss_samples[0][1], rss_samples[-1][1]
+        print(f"RSS: {first / 1048576:.2f}MB -> {last / 1048576:.2f}MB")
+    passed, message = verdict(rss_samples, python_samples, args.max_rss_growth, args.max_python_growth)
+    print(("通过: " if passed else "失败: ") + message)
+    if not passed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmark_stats import percentile
+from fuzzy_index import FuzzyIndex
+from notes_sqlite import SqliteNotesStore
+from notes_store import NotesStore
+from path_trie import PathTrie
+
+# 键（路径）和值（注释）的长度分布：
+#   (路径层数范围, 每层名字长度范围, 注释长度范围)
+SHAPES = {
+    'small': ((2, 3), (4, 8), (10, 40)),
+    'large': ((6, 10), (8, 20), (200, 2000)),
+    'mixed': ((2, 10), (4, 20), (10, 2000)),
+}
+WORDS = ["report", "invoice", "summary", "draft", "budget", "photo", "notes", "meeting",
+         "project", "design", "final", "backup", "data", "plan", "review", "contract"]
+NOTE_TEXT = "记录一下这个文件的用途 remember what this file is for 下次打开之前先看这里 "
+EXTS = [".txt", ".docx", ".xlsx", ".pdf", ".png", ".py", ".md"]
+
+# 越小越好的指标的后缀，比较两次结果时只看这些
+LOWER_IS_BETTER = ('_ms', '_bytes')
+
+def generate_items(count, shape='small', seed=0):
+    """
+    生成count条测试注释
+
+    路径按 "文件夹/…/文件名" 组织，每个最内层文件夹里大约100个文件，和真实的目录结构差不多
+
+    Returns:
+        [(文件名, 注释)] 列表，同样的参数每次生成的结果相同
+    """
+    rng = random.Random(seed)
+    (min_depth, max_depth), (min_part, max_part), (min_note, max_note) = SHAPES[shape]
+
+    def name(length):
+        word = rng.choice(WORDS)
+        return (word * (length // len(word) + 1))[:length]
+
+    items = []
+    folder = None
+    for i in range(count):
+        if i % 100 == 0:
+            depth = rng.randint(min_depth, max_depth)
+            folder = "/".join(
+                f"{name(rng.randint(min_part, max_part))}{i // 100}" for _ in range(depth)
+            )
+        filename = f"/data/{folder}/{name(rng.randint(min_part, max_part))}_{i}{rng.choice(EXTS)}"
+        length = rng.randint(min_note, max_note)
+        note = (NOTE_TEXT * (length // len(NOTE_TEXT) + 1))[:length]
+        items.append((filename, note))
+    return items
+
+def write_notes_file(path, items):
+    """把测试注释写成文本格式的快照文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for filename, note in items:
+            f.write(f"{filename}|{note}\n")
+
+def legacy_lookup(notes_file, filename):
+    """原来的查询方式：每次读整个文件逐行比较"""
+    with open(notes_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    for line in lines:
+        if line.strip():
+            parts = line.strip().split('|')
+            if len(parts) >= 2 and parts[0] == filename:
+                return parts[1]
+    return None
+
+def legacy_save(notes_file, filename, note):
+    """原来的保存方式：每次读入整个文件再全部写回"""
+    notes_dict = {}
+    with open(notes_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    for line in lines:
+        if line.strip():
+            parts = line.strip().split('|')
+            if len(parts) >= 2:
+                notes_dict[parts[0]] = parts[1]
+    notes_dict[filename] = note
+    with open(notes_file, 'w', encoding='utf-8') as f:
+        for fname, fnote in notes_dict.items():
+            f.write(f"{fname}|{fnote}\n")
+
+def timings(func, args):
+    """对args里的每一项调用一次func，返回每次的秒数"""
+    result = []
+    for arg in args:
+        begin = time.perf_counter()
+        func(arg)
+        result.append(time.perf_counter() - begin)
+    return result
+
+def summarize(prefix, seconds):
+    """把每次的耗时整理成 p50/p95/平均（毫秒）"""
+    seconds = sorted(seconds)
+    if not seconds:
+        return {}
+    return {
+        f'{prefix}_p50_ms': percentile(seconds, 50) * 1000,
+        f'{prefix}_p95_ms': percentile(seconds, 95) * 1000,
+        f'{prefix}_mean_ms': sum(seconds) * 1000 / len(seconds),
+    }
+
+def typo(name, rng):
+    """交换相邻的两个字母，模拟输错的文件名"""
+    if len(name) < 3:
+        return name
+    i = rng.randrange(len(name) - 1)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+def file_size(*paths):
+    """几个文件的总大小（不存在的算0）"""
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+def open_store(backend, path):
+    """打开一种存储"""
+    if backend == 'sqlite':
+        return SqliteNotesStore(path)
+    return NotesStore(path)
+
+def prepare(backend, path, items):
+    """在磁盘上准备好注释存储（不计时）"""
+    if backend == 'sqlite':
+        store = SqliteNotesStore(path)
+        store.import_items(items)
+        store.close()
+    else:
+        write_notes_file(path, items)
+
+def measure_memory(backend, path):
+    """
+    加载存储并建立FileNotesManager用的索引后，Python对象占用的内存
+
+    tracemalloc会让程序变慢，所以和计时分开单独跑一次
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        store = open_store(backend, path)
+        store_bytes = tracemalloc.get_traced_memory()[0] - base
+        fuzzy_index = FuzzyIndex().attach(store)
+        path_trie = PathTrie().attach(store)
+        current, peak = tracemalloc.get_traced_memory()
+        store.close()
+    finally:
+        tracemalloc.stop()
+    del fuzzy_index, path_trie
+    return {
+        'store_memory_bytes': store_bytes,
+        'indexes_memory_bytes': current - base - store_bytes,
+        'peak_memory_bytes': peak - base,
+    }
+
+def run(backend, count, shape, operations, directory, seed=0, memory=True, legacy_operations=0):
+    """
+    在count条注释上测一个后端
+
+    Args:
+        backend: 'text'（NotesStore）或 'sqlite'（SqliteNotesStore）
+        count: 注释条数
+        shape: SHAPES里的键值长度分布
+        operations: 查询、插入、修改、搜索各做的次数
+        directory: 放测试文件的目录
+        seed: 随机种子，同样的参数生成同样的数据和操作
+        memory: 是否测内存
+        legacy_operations: 大于0时也测原来每次读写整个文件的方式（只对text有意义，很慢）
+
+    Returns:
+        结果字典
+    """
+    items = generate_items(count, shape, seed)
+    filenames = [filename for filename, note in items]
+    path = os.path.join(directory, f"notes_{backend}_{shape}_{count}" + (".db" if backend == 'sqlite' else ".txt"))
+    prepare(backend, path, items)
+    del items
+
+    rng = random.Random(seed + 1)
+    hits = [rng.choice(filenames) for _ in range(operations)]
+    misses = [f"{filename}.missing" for filename in hits]
+    inserts = [f"/new/{shape}/{i}/{rng.choice(WORDS)}_{i}.txt" for i in range(operations)]
+    queries = [typo(filename.rsplit('/', 1)[1], rng) for filename in hits]
+    result = {'backend': backend, 'count': count, 'shape': shape, 'operations': operations}
+
+    start = time.perf_counter()
+    store = open_store(backend, path)
+    result['cold_load_ms'] = (time.perf_counter() - start) * 1000
+    # SQLite打开时不读数据，第一次查询才真正读磁盘
+    start = time.perf_counter()
+    store.get(hits[0])
+    result['first_lookup_ms'] = (time.perf_counter() - start) * 1000
+
+    result.update(summarize('lookup', timings(store.get, hits)))
+    result.update(summarize('miss', timings(store.get, misses)))
+    result.update(summarize('insert', timings(lambda key: store.set(key, "新加的注释"), inserts)))
+    result.update(summarize('update', timings(lambda key: store.set(key, "修改后的注释"), hits)))
+
+    # 搜索：和FileNotesManager一样，先建文件名的模糊索引和路径前缀树
+    start = time.perf_counter()
+    fuzzy_index = FuzzyIndex().attach(store)
+    result['fuzzy_build_ms'] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    path_trie = PathTrie().attach(store)
+    result['trie_build_ms'] = (time.perf_counter() - start) * 1000
+    found = []
+    result.update(summarize('fuzzy_search', timings(lambda query: found.append(fuzzy_index.search(query)), queries)))
+    result['fuzzy_hit_rate'] = sum(
+        any(key == target for key, score in matches) for matches, target in zip(found, hits)
+    ) / len(hits)
+    result.update(summarize('folder_chain', timings(path_trie.chain, hits)))
+    if hasattr(store, 'search'):
+        words = [rng.choice(WORDS) for _ in range(operations)]
+        result.update(summarize('fulltext_search', timings(store.search, words)))
+    store.close()
+    del fuzzy_index, path_trie, store
+
+    if backend == 'sqlite':
+        result['disk_bytes'] = file_size(path, path + "-wal")
+    else:
+        result['disk_bytes'] = file_size(path, path + ".journal")
+    if memory:
+        result.update(measure_memory(backend, path))
+
+    if legacy_operations and backend == 'text':
+        legacy_keys = hits[:legacy_operations]
+        result.update(summarize('legacy_lookup', timings(lambda key: legacy_lookup(path, key), legacy_keys)))
+        result.update(summarize('legacy_save', timings(lambda key: legacy_save(path, key, "修改后的注释"), legacy_keys)))
+    return result
+
+def result_key(result):
+    return (result['backend'], result['count'], result['shape'])
+
+def compare(previous, current, threshold=0.25, min_ms=0.05, min_bytes=65536):
+    """
+    和上一次的结果比较，找出变差的指标
+
+    只比较越小越好的指标（耗时、内存、磁盘），变差超过threshold的比例、
+    并且绝对差值超过min_ms/min_bytes（避免把很小的数的抖动当成变差）才算
+
+    Returns:
+        [(后端, 条数, 分布, 指标, 上次, 这次)] 列表
+    """
+    old_results = {result_key(result): result for result in previous['results']}
+    regressions = []
+    for result in current['results']:
+        old = old_results.get(result_key(result))
+        if old is None:
+            continue
+        for metric, value in result.items():
+            if not metric.endswith(LOWER_IS_BETTER) or not isinstance(old.get(metric), (int, float)):
+                continue
+            before = old[metric]
+            floor = min_ms if metric.endswith('_ms') else min_bytes
+            if value > before * (1 + threshold) and value - before > floor:
+                regressions.append((*result_key(result), metric, before, value))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="文件注释存储的基准测试")
+    parser.add_argument('--sizes', default="1000,10000,100000", help="注释条数，逗号分隔（最大可以到1000000）")
+    parser.add_argument('--shapes', default="small,large", help=f"键值长度分布，逗号分隔，可选 {','.join(SHAPES)}")
+    parser.add_argument('--backends', default="text,sqlite", help="要测试的存储，逗号分隔")
+    parser.add_argument('--operations', type=int, default=200, help="每项测试的操作次数")
+    parser.add_argument('--legacy-operations', type=int, default=0, help="也测原来每次读写整个文件的方式（很慢）")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--no-memory', action='store_true', help="不测内存（tracemalloc比较慢）")
+    parser.add_argument('--json', help="把结果写入JSON文件")
+    parser.add_argument('--compare', help="和以前用 --json 保存的结果比较，有变差的指标时退出码为1")
+    parser.add_argument('--threshold', type=float, default=0.25, help="变差超过这个比例才报告")
+    parser.add_argument('--dir', help="放测试文件的目录，默认用临时目录")
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'seed': args.seed,
+            'operations': args.operations,
+        },
+        'results': [],
+    }
+    print(f"{'存储':<8}{'分布':<8}{'条数':>9}{'加载(ms)':>11}{'查询p95':>10}{'插入p95':>10}"
+          f"{'修改p95':>10}{'模糊搜索p95':>13}{'内存(MB)':>10}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for count in (int(size) for size in args.sizes.split(',')):
+            for shape in args.shapes.split(','):
+                for backend in args.backends.split(','):
+                    result = run(backend, count, shape, args.operations, directory, args.seed,
+                                 not args.no_memory, args.legacy_operations)
+                    report['results'].append(result)
+                    memory = result.get('store_memory_bytes', 0) + result.get('indexes_memory_bytes', 0)
+                    print(f"{backend:<8}{shape:<8}{count:>9}{result['cold_load_ms']:>11.1f}"
+                          f"{result['lookup_p95_ms']:>10.4f}{result['insert_p95_ms']:>10.3f}"
+                          f"{result['update_p95_ms']:>10.3f}{result['fuzzy_search_p95_ms']:>13.3f}"
+                          f"{memory / 1048576:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare(previous, report, args.threshold)
+        if not regressions:
+            print(f"和 {args.compare} 相比没有变差的指标")
+            return
+        print(f"和 {args.compare} 相比变差的指标:")
+        for backend, count, shape, metric, before, value in regressions:
+            print(f"  {backend} {shape} {count}: {metric} {before:.4g} -> {value:.4g} ({value / before - 1:+.0%})"
+                  if before else f"  {backend} {shape} {count}: {metric} {before} -> {value}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
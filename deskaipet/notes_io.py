@@ -0,0 +1,247 @@
+import argparse
+import csv
+import json
+import os
+import time
+from notes_store import NotesStore
+from notes_sqlite import SqliteNotesStore
+
+# 支持的格式：
+#   jsonl: 每行一个 {"filename": ..., "note": ...}
+#   csv:   表头为 filename,note
+#   text:  旧的 folder_notes.txt，每行 文件名|注释（file_notes_manager）
+#   json:  旧的 {文件夹路径: 注释} 字典（aipartcode，文件名也叫 folder_notes.txt）
+FORMATS = ('jsonl', 'csv', 'text', 'json')
+
+def _first_char(path):
+    """文件里第一个非空白字符，空文件返回空字符串"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return ''
+            chunk = chunk.lstrip()
+            if chunk:
+                return chunk[0]
+
+def detect_format(path):
+    """按扩展名判断格式；.txt 等其它扩展名看内容是不是JSON字典"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext == '.csv':
+        return 'csv'
+    if ext == '.json':
+        return 'json'
+    if os.path.exists(path) and _first_char(path) == '{':
+        return 'json'
+    return 'text'
+
+def read_jsonl(path):
+    """逐行读取JSONL，跳过无效的行"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                filename, note = record['filename'], record['note']
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"第{number}行格式不对，跳过: {e}")
+                continue
+            if isinstance(filename, str) and isinstance(note, str):
+                yield filename, note
+
+def read_csv(path):
+    """逐行读取CSV，第一行是 filename,note 表头时跳过"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        for number, row in enumerate(reader, 1):
+            if len(row) < 2:
+                continue
+            if number == 1 and [cell.strip().lower() for cell in row[:2]] == ['filename', 'note']:
+                continue
+            yield row[0], row[1]
+
+def read_text(path):
+    """逐行读取旧的 文件名|注释 格式"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            filename, sep, note = line.rstrip('\n').partition('|')
+            if sep and filename:
+                yield filename, note
+
+def read_json(path):
+    """读取旧的JSON字典（整个文件是一个对象，只能一次读入，好在这种文件都不大）"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        notes = json.load(f)
+    for filename, note in notes.items():
+        if isinstance(note, str):
+            yield filename, note
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+    'text': read_text,
+    'json': read_json,
+}
+
+def iter_notes(path, fmt=None):
+    """按格式逐条读取文件里的 (文件名, 注释)"""
+    if fmt is None:
+        fmt = detect_format(path)
+        if fmt == 'json' and os.path.splitext(path)[1].lower() != '.json':
+            # 只是看第一个字符猜的，解析不了就还是文本格式
+            items = load_legacy_json(path)
+            return iter(items) if items is not None else read_text(path)
+    return READERS[fmt](path)
+
+def import_notes(store, path, fmt=None):
+    """
+    把文件里的注释导入store（流式读取，同名的注释以后出现的为准）
+
+    Returns:
+        导入的条数
+    """
+    return store.import_items(iter_notes(path, fmt))
+
+def export_notes(items, path, fmt=None):
+    """
+    把注释逐条写成JSONL、CSV或旧的文本格式
+
+    Args:
+        items: (文件名, 注释) 的可迭代对象，例如 store.iter_items()
+        path: 输出文件
+        fmt: 'jsonl'、'csv' 或 'text'，None表示按扩展名判断
+
+    Returns:
+        写出的条数
+    """
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv'}.get(ext, 'text')
+    count = 0
+    temp_file = path + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'jsonl':
+            for filename, note in items:
+                f.write(json.dumps({'filename': filename, 'note': note}, ensure_ascii=False) + "\n")
+                count += 1
+        elif fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['filename', 'note'])
+            for filename, note in items:
+                writer.writerow([filename, note])
+                count += 1
+        elif fmt == 'text':
+            for filename, note in items:
+                f.write(f"{NotesStore._clean(filename)}|{NotesStore._clean(note)}\n")
+                count += 1
+        else:
+            raise ValueError(f"不支持导出成 {fmt} 格式")
+    os.replace(temp_file, path)
+    return count
+
+def load_legacy_json(path):
+    """
+    读取旧的JSON字典格式的注释文件
+
+    Returns:
+        [(文件名, 注释)]；文件不是合法的JSON字典时返回None
+        （例如文本格式的注释文件，第一条注释的文件名正好以 { 开头）
+    """
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            notes = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"{path} 不是JSON格式，按文本格式打开: {e}")
+        return None
+    if not isinstance(notes, dict):
+        return None
+    return [(filename, note) for filename, note in notes.items() if isinstance(note, str)]
+
+def take_legacy_json(notes_file):
+    """
+    如果注释文件是旧的JSON字典格式（aipartcode写的），读出全部注释，再把它改名为 .json.bak 让出位置
+
+    先完整解析再改名，解析失败时不动原文件
+
+    Returns:
+        (改名后的路径, [(文件名, 注释)])；不是JSON格式时返回None
+    """
+    if not os.path.exists(notes_file) or detect_format(notes_file) != 'json':
+        return None
+    items = load_legacy_json(notes_file)
+    if items is None:
+        return None
+    backup = notes_file + ".json.bak"
+    if os.path.exists(backup):
+        backup = f"{notes_file}.{int(time.time())}.json.bak"
+    os.replace(notes_file, backup)
+    return backup, items
+
+def open_text_store(notes_file="folder_notes.txt"):
+    """
+    打开文本格式的注释存储；注释文件还是旧的JSON字典格式时，先迁移过来
+
+    Returns:
+        NotesStore
+    """
+    legacy = take_legacy_json(notes_file)
+    store = NotesStore(notes_file)
+    if legacy:
+        backup, items = legacy
+        count = store.import_items(items)
+        print(f"已经把 {count} 条旧格式的注释迁移到 {notes_file}，原文件保存为 {backup}")
+    return store
+
+def migrate_legacy_notes(store, paths):
+    """
+    把若干个旧格式的注释文件（文本格式、JSON字典，可以混着）一次导入store
+
+    Returns:
+        导入的条数
+    """
+    def chained():
+        for path in paths:
+            if os.path.exists(path):
+                yield from iter_notes(path)
+    return store.import_items(chained())
+
+def open_store(args):
+    """按命令行参数打开注释存储"""
+    if args.db:
+        return SqliteNotesStore(args.db)
+    return open_text_store(args.notes)
+
+def main():
+    parser = argparse.ArgumentParser(description="文件注释的批量导入、导出和旧格式迁移")
+    parser.add_argument('--notes', default="folder_notes.txt", help="文本格式的注释文件")
+    parser.add_argument('--db', help="使用SQLite注释数据库（例如 folder_notes.db）")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="从JSONL/CSV/旧格式文件导入")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--format', choices=FORMATS)
+    export_parser = commands.add_parser('export', help="导出为JSONL/CSV")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--format', choices=('jsonl', 'csv', 'text'))
+    migrate_parser = commands.add_parser('migrate', help="把旧格式的注释文件一次迁移进来")
+    migrate_parser.add_argument('paths', nargs='+')
+    args = parser.parse_args()
+
+    store = open_store(args)
+    start = time.perf_counter()
+    try:
+        if args.command == 'import':
+            count = import_notes(store, args.path, args.format)
+        elif args.command == 'export':
+            count = export_notes(store.iter_items(), args.path, args.format)
+        else:
+            count = migrate_legacy_notes(store, args.paths)
+    finally:
+        store.close()
+    print(f"处理了 {count} 条注释，用时 {time.perf_counter() - start:.2f} 秒")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import re
+import sqlite3
+import threading
+
+# 中日韩文字之间没有空格，建索引和查询时在每个字两边加空格，按字（连续的字按短语）匹配
+CJK_CHAR = re.compile('([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+
+def _index_text(text):
+    """全文索引用的文本"""
+    if text.isascii():
+        return text
+    return CJK_CHAR.sub(r' \1 ', text)
+
+def build_match_query(query):
+    """
+    把用户输入的关键词转成FTS5查询
+
+    每个词作为一个短语，所有词都要出现；最后一个词按前缀匹配（边输入边搜索）
+
+    Returns:
+        FTS5的MATCH表达式，没有可搜索的词时返回None
+    """
+    phrases = []
+    for word in query.split():
+        word = word.replace('"', ' ')
+        if not any(char.isalnum() for char in word):
+            continue
+        phrases.append('"' + ' '.join(_index_text(word).split()) + '"')
+    if not phrases:
+        return None
+    phrases[-1] += ' *'
+    return ' '.join(phrases)
+
+class SqliteNotesStore:
+    def __init__(self, db_file="folder_notes.db"):
+        """
+        文件注释存储（SQLite + FTS5全文索引）
+
+        和NotesStore的接口相同，另外支持按文件名和注释内容搜索。
+        注释里可以有 | 和换行，不受文本格式的限制
+
+        Args:
+            db_file: 数据库文件路径
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.has_fts = self._init_db()
+        # 注释变化时的回调，和NotesStore相同
+        self._listeners = []
+
+    def _init_db(self):
+        """创建注释表和全文索引，返回FTS5是否可用"""
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS notes ("
+            " filename TEXT NOT NULL UNIQUE,"
+            " note TEXT NOT NULL)"
+        )
+        # 存储自身的状态（例如是否已经从文本文件迁移过）
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL)"
+        )
+        try:
+            # 索引表的rowid和notes表一致
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+                " filename, note, tokenize='unicode61 remove_diacritics 2')"
+            )
+            has_fts = True
+        except sqlite3.OperationalError as e:
+            # 有的Python自带的SQLite没有编译FTS5，搜索退回到LIKE
+            print(f"SQLite不支持FTS5，注释搜索会比较慢: {e}")
+            has_fts = False
+        self._conn.commit()
+        return has_fts
+
+    def get(self, filename):
+        """查询注释，没有时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT note FROM notes WHERE filename=?", (filename.strip(),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, filename):
+        return self.get(filename) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def items(self):
+        """所有 (文件名, 注释)"""
+        with self._lock:
+            return self._conn.execute("SELECT filename, note FROM notes ORDER BY rowid").fetchall()
+
+    def iter_items(self, batch_size=10000):
+        """逐批读取所有 (文件名, 注释)，内存里最多只有一批，用于导出"""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, filename, note FROM notes WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, filename, note in rows:
+                yield filename, note
+            last_rowid = rows[-1][0]
+
+    def add_listener(self, listener):
+        """注册注释变化的回调 listener(op, 文件名, 值)，在修改注释的线程中调用"""
+        self._listeners.append(listener)
+
+    def _notify(self, op, filename, value):
+        for listener in self._listeners:
+            try:
+                listener(op, filename, value)
+            except Exception as e:
+                print(f"注释变化的回调出错了: {e}")
+
+    def _index(self, rowid, filename, note, is_new=False):
+        """更新一条注释的全文索引（调用方需持有锁）"""
+        if self.has_fts:
+            if not is_new:
+                self._conn.execute("DELETE FROM notes_fts WHERE rowid=?", (rowid,))
+            if filename is not None:
+                self._conn.execute(
+                    "INSERT INTO notes_fts (rowid, filename, note) VALUES (?, ?, ?)",
+                    (rowid, _index_text(filename), _index_text(note))
+                )
+
+    def _write(self, filename, note):
+        """写入一条注释和它的索引（调用方需持有锁），返回原来是否已经有注释"""
+        row = self._conn.execute("SELECT rowid FROM notes WHERE filename=?", (filename,)).fetchone()
+        if row:
+            rowid = row[0]
+            self._conn.execute("UPDATE notes SET note=? WHERE rowid=?", (note, rowid))
+        else:
+            rowid = self._conn.execute(
+                "INSERT INTO notes (filename, note) VALUES (?, ?)", (filename, note)
+            ).lastrowid
+        self._index(rowid, filename, note, is_new=row is None)
+        return row is not None
+
+    def set(self, filename, note):
+        """
+        添加或修改注释
+
+        Returns:
+            这个文件名原来是否已经有注释
+        """
+        filename = filename.strip()
+        note = note.strip()
+        with self._lock:
+            existed = self._write(filename, note)
+            self._conn.commit()
+        self._notify('set', filename, note)
+        return existed
+
+    def delete(self, filename):
+        """删除注释，返回原来是否有这条注释"""
+        with self._lock:
+            row = self._conn.execute("SELECT rowid FROM notes WHERE filename=?", (filename,)).fetchone()
+            if not row:
+                return False
+            self._conn.execute("DELETE FROM notes WHERE rowid=?", row)
+            self._index(row[0], None, None)
+            self._conn.commit()
+        self._notify('delete', filename, None)
+        return True
+
+    def rename(self, old_filename, new_filename):
+        """
+        把注释移到新的文件名下（文件被移动或改名时），新文件名原有的注释会被覆盖
+
+        Returns:
+            原来的文件名是否有注释
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rowid, note FROM notes WHERE filename=?", (old_filename,)
+            ).fetchone()
+            if not row:
+                return False
+            if old_filename == new_filename:
+                # 新旧文件名相同时什么都不用做，否则下面会把这条注释当成被覆盖的注释删掉
+                return True
+            rowid, note = row
+            replaced = self._conn.execute(
+                "SELECT rowid FROM notes WHERE filename=?", (new_filename,)
+            ).fetchone()
+            if replaced:
+                self._conn.execute("DELETE FROM notes WHERE rowid=?", replaced)
+                self._index(replaced[0], None, None)
+            self._conn.execute("UPDATE notes SET filename=? WHERE rowid=?", (new_filename, rowid))
+            self._index(rowid, new_filename, note)
+            self._conn.commit()
+        self._notify('rename', old_filename, new_filename)
+        return True
+
+    def import_items(self, items, batch_size=10000):
+        """
+        批量写入注释，每batch_size条提交一次
+
+        Args:
+            items: (文件名, 注释) 的可迭代对象，可以是生成器
+
+        Returns:
+            写入的条数
+        """
+        count = 0
+        with self._lock:
+            for filename, note in items:
+                filename = filename.strip()
+                if not filename:
+                    continue
+                note = note.strip()
+                self._write(filename, note)
+                if self._listeners:
+                    self._notify('set', filename, note)
+                count += 1
+                if count % batch_size == 0:
+                    self._conn.commit()
+            self._conn.commit()
+        return count
+
+    def get_meta(self, key, default=None):
+        """读取存储自身的状态"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        """保存存储自身的状态"""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def search(self, query, limit=10):
+        """
+        按关键词搜索文件名和注释，文件名里出现的词权重更高
+
+        Args:
+            query: 空格分隔的关键词，最后一个词可以只输入开头
+
+        Returns:
+            按相关度排序的 [(文件名, 注释)] 列表
+        """
+        if not self.has_fts:
+            words = query.split()
+            if not words:
+                return []
+            condition = " AND ".join("(filename LIKE ? OR note LIKE ?)" for _ in words)
+            params = [f"%{word}%" for word in words for _ in range(2)]
+            with self._lock:
+                return self._conn.execute(
+                    f"SELECT filename, note FROM notes WHERE {condition} LIMIT ?", params + [limit]
+                ).fetchall()
+
+        match = build_match_query(query)
+        if match is None:
+            return []
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "SELECT notes.filename, notes.note FROM notes_fts"
+                    " JOIN notes ON notes.rowid = notes_fts.rowid"
+                    " WHERE notes_fts MATCH ?"
+                    " ORDER BY bm25(notes_fts, 10.0, 1.0) LIMIT ?",
+                    (match, limit)
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"搜索注释失败了: {e}")
+            return []
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
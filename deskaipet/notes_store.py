@@ -0,0 +1,475 @@
+import json
+import os
+import threading
+import uuid
+from file_lock import FileLock
+
+class NotesStore:
+    def __init__(self, notes_file="folder_notes.txt", compact_threshold=10000):
+        """
+        文件注释存储
+
+        启动时把注释读一次，放进以文件名为键的字典里，之后查询不再读文件。
+
+        注释文件（快照）格式和原来一样，每行: 文件名|注释。
+        保存时不改动快照，只在日志文件（notes_file + ".journal"）末尾追加一条记录并fsync，
+        保存的耗时和注释总数无关，写到一半断电也只会丢掉最后这一条。
+        日志记录多了以后在后台线程里把全部注释写成新快照，写完再原子替换旧快照。
+
+        多个桌宠进程可以同时使用同一个注释文件：写入（以及整理）前先获取文件锁
+        （notes_file + ".lock"），并先读入别的进程写的新记录，所以不会覆盖别人的保存；
+        查询时只stat一下日志文件，没有变化就直接用内存里的注释
+
+        Args:
+            notes_file: 注释文件（快照）路径
+            compact_threshold: 日志记录数超过这个值（且超过注释总数）时整理成新快照
+        """
+        self.notes_file = notes_file
+        self.journal_file = notes_file + ".journal"
+        # 正在整理的日志，整理完成前程序退出的话，下次启动时还会重放它
+        self.compacting_file = notes_file + ".compacting"
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(notes_file + ".lock")
+        self._notes = {}
+        self._journal_records = 0
+        # 上次读到的日志位置、日志的编号和文件状态，见 _generation
+        self._journal_offset = 0
+        self._journal_token = None
+        self._seen = None
+        self._compact_thread = None
+        # 注释变化时的回调 listener(op, 文件名, 值)，op为 'set'（值为注释）、'delete'、'rename'（值为新文件名）
+        self._listeners = []
+        self.load()
+
+    @staticmethod
+    def _clean(text):
+        """注释里的换行会破坏一行一条的格式，换成空格"""
+        return ' '.join(text.splitlines()).strip()
+
+    @staticmethod
+    def _read_snapshot(path, notes):
+        """读取快照文件，返回读到的行数"""
+        lines = 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # 注释里可能也有 |，只按第一个切开
+                    filename, sep, note = line.rstrip('\n').partition('|')
+                    if sep and filename:
+                        notes[filename] = note
+                        lines += 1
+        return lines
+
+    @staticmethod
+    def _replay_journal(path, notes, start=0, changes=None):
+        """
+        从start位置开始按顺序重放日志文件
+
+        Args:
+            changes: 不为None时，把每条记录对应的 (op, 文件名, 值) 追加到这个列表里
+
+        Returns:
+            (有效的记录数, 最后一条完整记录结束的位置)
+        """
+        records = 0
+        end = start
+        if not os.path.exists(path):
+            return records, end
+        with open(path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                # 最后一条可能只写了一半（写入时断电），忽略
+                if not line.endswith(b'\n'):
+                    break
+                end += len(line)
+                try:
+                    op, filename, note = json.loads(line)
+                except ValueError:
+                    continue
+                if op == 'set':
+                    notes[filename] = note
+                elif op == 'delete':
+                    notes.pop(filename, None)
+                elif op == 'rename' and filename in notes:
+                    # 改名记录的第三项是新文件名
+                    notes[note] = notes.pop(filename)
+                else:
+                    continue
+                if changes is not None:
+                    changes.append((op, filename, note))
+                records += 1
+        return records, end
+
+    @staticmethod
+    def _stat_key(path):
+        """文件的 (设备号, inode号, 大小)，不存在时为None"""
+        try:
+            result = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (result.st_dev, result.st_ino, result.st_size)
+
+    def _read_token(self):
+        """
+        日志第一行记录的编号，每个新建的日志文件都不同
+
+        日志被整理掉以后新建的日志可能正好用回原来的inode号，大小也可能刚好不比原来小，
+        只看文件状态分辨不出来，要靠这个编号
+
+        Returns:
+            编号，日志不存在或是早期版本没有编号的日志时为None
+        """
+        try:
+            with open(self.journal_file, 'rb') as f:
+                first = f.readline()
+            op, token, _ = json.loads(first)
+        except (OSError, ValueError):
+            return None
+        return token if op == 'journal' else None
+
+    def _generation(self):
+        """
+        日志和 .compacting 文件的状态
+
+        别的进程保存注释时日志会变大；整理时日志被改名、.compacting 出现或消失。
+        状态和上次读到的一样，说明内存里的注释就是最新的，不需要读文件
+        """
+        return self._stat_key(self.journal_file), self._stat_key(self.compacting_file)
+
+    def load(self):
+        """读取快照并重放日志（启动时调用）"""
+        with self._file_lock:
+            interrupted = os.path.exists(self.compacting_file)
+            lines = self._reload()
+        # 上次整理没有完成，或者快照里有很多重复的行（早期版本直接追加在快照后面），重新整理一次
+        if interrupted or lines - len(self._notes) > max(len(self._notes), 1000):
+            self.compact(wait=True)
+
+    def _reload(self):
+        """
+        重新读取快照和全部日志（调用方需持有文件锁）
+
+        Returns:
+            快照的行数
+        """
+        initial = self._seen is None
+        notes = {}
+        lines = self._read_snapshot(self.notes_file, notes)
+        records = self._replay_journal(self.compacting_file, notes)[0]
+        journal_records, journal_end = self._replay_journal(self.journal_file, notes)
+        records += journal_records
+        self._truncate_journal(journal_end)
+
+        with self._lock:
+            old_notes = self._notes
+            self._notes = notes
+            self._journal_records = records
+            self._journal_offset = journal_end
+            self._journal_token = self._read_token()
+            self._seen = self._generation()
+        if not initial and self._listeners:
+            # 别的进程整理过文件，把前后的差别告诉回调
+            for filename in old_notes.keys() - notes.keys():
+                self._notify('delete', filename, None)
+            for filename, note in notes.items():
+                if old_notes.get(filename) != note:
+                    self._notify('set', filename, note)
+        return lines
+
+    def _truncate_journal(self, end):
+        """去掉只写了一半的记录（写入的进程中途崩溃了），否则新记录会接在它后面（调用方需持有文件锁）"""
+        if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > end:
+            os.truncate(self.journal_file, end)
+
+    def refresh(self):
+        """
+        读取别的进程写入的新注释
+
+        先比较日志文件的状态（只需要stat），没有变化时直接返回；
+        只是日志变长了就从上次读到的位置接着重放，日志被整理过才重新读取全部文件
+
+        Returns:
+            是否读到了变化
+        """
+        if self._generation() == self._seen:
+            return False
+        with self._file_lock:
+            self._catch_up()
+        return True
+
+    def _catch_up(self):
+        """让内存里的注释和文件一致（调用方需持有文件锁）"""
+        journal, compacting = self._generation()
+        seen_journal, seen_compacting = self._seen
+        if (journal, compacting) == self._seen:
+            return
+        appended = (
+            compacting == seen_compacting
+            and journal is not None
+            and seen_journal is not None
+            and journal[:2] == seen_journal[:2]
+            and journal[2] >= self._journal_offset
+            and self._read_token() == self._journal_token
+        )
+        if not appended:
+            self._reload()
+            return
+        changes = []
+        with self._lock:
+            records, end = self._replay_journal(
+                self.journal_file, self._notes, self._journal_offset, changes
+            )
+            self._journal_records += records
+            self._journal_offset = end
+        self._truncate_journal(end)
+        with self._lock:
+            self._seen = self._generation()
+        for op, filename, value in changes:
+            self._notify(op, filename, value)
+
+    def get(self, filename):
+        """查询注释，没有时返回None"""
+        self.refresh()
+        return self._notes.get(filename.strip())
+
+    def __contains__(self, filename):
+        self.refresh()
+        return filename in self._notes
+
+    def __len__(self):
+        self.refresh()
+        return len(self._notes)
+
+    def items(self):
+        """所有 (文件名, 注释)"""
+        self.refresh()
+        with self._lock:
+            return list(self._notes.items())
+
+    def iter_items(self):
+        """逐条返回所有 (文件名, 注释)，用于导出"""
+        return iter(self.items())
+
+    def _append(self, journal, op, filename, note, sync=True):
+        """写入一条日志记录并刷到磁盘（调用方需持有锁）"""
+        journal.write(json.dumps([op, filename, note], ensure_ascii=False) + "\n")
+        if sync:
+            self._sync_journal(journal)
+        self._journal_records += 1
+
+    @staticmethod
+    def _sync_journal(journal):
+        """把日志刷到磁盘"""
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    def _open_journal(self):
+        """
+        打开日志准备追加（调用方需持有文件锁）
+
+        每次写入时才打开、写完就关闭：Windows下打开着的文件不能被别的进程改名，
+        一直开着会让别的进程没法整理日志。新建的日志先写一行编号，见 _read_token
+        """
+        journal = open(self.journal_file, 'a', encoding='utf-8')
+        if journal.tell() == 0:
+            token = uuid.uuid4().hex
+            journal.write(json.dumps(['journal', token, None]) + "\n")
+            self._sync_journal(journal)
+            self._journal_token = token
+        return journal
+
+    def _written(self):
+        """写完日志之后记下文件的新状态，自己写的记录不需要再重放（调用方需持有文件锁）"""
+        with self._lock:
+            self._seen = self._generation()
+            self._journal_offset = self._seen[0][2]
+
+    def add_listener(self, listener):
+        """注册注释变化的回调，在修改注释的线程中调用"""
+        self._listeners.append(listener)
+
+    def _notify(self, op, filename, value):
+        for listener in self._listeners:
+            try:
+                listener(op, filename, value)
+            except Exception as e:
+                print(f"注释变化的回调出错了: {e}")
+
+    def _after_write(self, op, filename, value):
+        """写入日志之后：通知回调，日志太长时整理"""
+        self._notify(op, filename, value)
+        if self._journal_records > max(self.compact_threshold, len(self._notes)):
+            self.compact()
+
+    def set(self, filename, note):
+        """
+        添加或修改注释，在日志末尾追加一条记录
+
+        Returns:
+            这个文件名原来是否已经有注释
+        """
+        filename = self._clean(filename)
+        note = self._clean(note)
+        with self._file_lock:
+            self._catch_up()
+            with self._lock:
+                existed = filename in self._notes
+                with self._open_journal() as journal:
+                    self._append(journal, 'set', filename, note)
+                self._notes[filename] = note
+            self._written()
+        self._after_write('set', filename, note)
+        return existed
+
+    def import_items(self, items, batch_size=10000):
+        """
+        批量写入注释，每batch_size条fsync一次（不用每条都等磁盘）
+
+        Args:
+            items: (文件名, 注释) 的可迭代对象，可以是生成器
+
+        Returns:
+            写入的条数
+        """
+        count = 0
+        with self._file_lock:
+            self._catch_up()
+            with self._lock, self._open_journal() as journal:
+                for filename, note in items:
+                    filename = self._clean(filename)
+                    if not filename:
+                        continue
+                    note = self._clean(note)
+                    self._append(journal, 'set', filename, note, sync=False)
+                    self._notes[filename] = note
+                    if self._listeners:
+                        self._notify('set', filename, note)
+                    count += 1
+                    if count % batch_size == 0:
+                        self._sync_journal(journal)
+                self._sync_journal(journal)
+            self._written()
+        if self._journal_records > max(self.compact_threshold, len(self._notes)):
+            self.compact()
+        return count
+
+    def delete(self, filename):
+        """删除注释，返回原来是否有这条注释"""
+        with self._file_lock:
+            self._catch_up()
+            with self._lock:
+                if filename not in self._notes:
+                    return False
+                with self._open_journal() as journal:
+                    self._append(journal, 'delete', filename, None)
+                del self._notes[filename]
+            self._written()
+        self._after_write('delete', filename, None)
+        return True
+
+    def rename(self, old_filename, new_filename):
+        """
+        把注释移到新的文件名下（文件被移动或改名时），新文件名原有的注释会被覆盖
+
+        Returns:
+            原来的文件名是否有注释
+        """
+        with self._file_lock:
+            self._catch_up()
+            with self._lock:
+                if old_filename not in self._notes:
+                    return False
+                with self._open_journal() as journal:
+                    self._append(journal, 'rename', old_filename, new_filename)
+                self._notes[new_filename] = self._notes.pop(old_filename)
+            self._written()
+        self._after_write('rename', old_filename, new_filename)
+        return True
+
+    def compact(self, wait=False):
+        """
+        把当前的全部注释写成新快照，然后清掉日志
+
+        先把日志改名为 .compacting 并开始写新的日志，之后的保存不受影响；
+        快照在后台线程里写临时文件，fsync后原子替换旧快照，最后才删除 .compacting
+
+        Args:
+            wait: 是否等待整理完成
+        """
+        with self._file_lock:
+            if self._compact_thread is not None and self._compact_thread.is_alive():
+                thread = self._compact_thread
+            else:
+                self._catch_up()
+                with self._lock:
+                    if os.path.exists(self.compacting_file):
+                        # 上一次整理（可能是别的进程的）没有完成，它的记录已经在内存里了，这次的快照会包含它们
+                        if os.path.exists(self.journal_file):
+                            with open(self.compacting_file, 'a', encoding='utf-8') as target, \
+                                    open(self.journal_file, 'r', encoding='utf-8') as source:
+                                target.writelines(source)
+                            os.remove(self.journal_file)
+                    else:
+                        self._open_journal().close()
+                        os.replace(self.journal_file, self.compacting_file)
+                    # 马上建好新的日志，别的进程凭它的编号知道发生过整理
+                    self._open_journal().close()
+                    self._journal_records = 0
+                    self._seen = self._generation()
+                    self._journal_offset = self._seen[0][2]
+
+                    thread = threading.Thread(
+                        target=self._write_snapshot, args=(dict(self._notes), self._seen[1]), daemon=True
+                    )
+                    self._compact_thread = thread
+                    thread.start()
+        if wait:
+            thread.join()
+
+    def _write_snapshot(self, notes, compacting):
+        """
+        写新快照并替换旧快照（后台线程）
+
+        Args:
+            notes: 要写入的全部注释
+            compacting: 开始整理时 .compacting 的状态；替换前它变了，说明别的进程接着做了
+                        一次包含更多记录的整理，这次的快照已经过时，丢掉
+        """
+        temp_file = f"{self.notes_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.writelines(f"{filename}|{note}\n" for filename, note in notes.items())
+                f.flush()
+                os.fsync(f.fileno())
+            with self._file_lock:
+                if self._stat_key(self.compacting_file) != compacting:
+                    os.remove(temp_file)
+                    return
+                os.replace(temp_file, self.notes_file)
+                self._sync_directory()
+                os.remove(self.compacting_file)
+                with self._lock:
+                    # 快照已经包含 .compacting 里的记录，不需要因为它消失而重新读取
+                    if self._seen[1] == compacting:
+                        self._seen = (self._seen[0], None)
+        except Exception as e:
+            print(f"整理注释文件失败了: {e}")
+
+    def _sync_directory(self):
+        """让文件改名也落到磁盘上（Windows不支持对目录fsync，跳过）"""
+        if os.name != 'posix':
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.notes_file)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """等待后台整理完成并关闭锁文件"""
+        thread = self._compact_thread
+        if thread is not None:
+            thread.join()
+        self._file_lock.close()
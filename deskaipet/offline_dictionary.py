@@ -0,0 +1,245 @@
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+# 内置的基础词条，词典为空时写入
+BUILTIN_ENTRIES = {
+    "hello": "你好",
+    "world": "世界",
+    "good morning": "早上好",
+    "thank you": "谢谢",
+    "goodbye": "再见",
+    "file": "文件",
+    "save": "保存",
+    "folder": "文件夹",
+    "note": "注释",
+    "computer": "电脑",
+    "program": "程序",
+    "python": "Python编程语言",
+    "desktop": "桌面",
+    "pet": "宠物"
+}
+
+# 英文按单词切分，数字和其它符号单独成词
+EN_TOKEN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?|\d+|\S")
+
+class OfflineDictionary:
+    def __init__(self, db_file="offline_dict.db", max_memo=4096):
+        """
+        离线词典（SQLite索引，按需内存映射）
+
+        打开时不读取任何词条，第一次查询时才连接数据库，
+        查询走主键索引，几十万词条也只需要微秒级的时间
+
+        Args:
+            db_file: 词典数据库文件路径
+            max_memo: 内存中记住的最近查询结果数
+        """
+        self.db_file = db_file
+        self.max_memo = max_memo
+        self._conn = None
+        self._lock = threading.Lock()
+        self._memo = {}
+        # 每种语言的最长词组长度（英文按单词数，中文按字数），用于最长匹配
+        self._max_phrase = {}
+
+    def _connect(self):
+        """第一次使用时连接数据库（调用方需持有锁）"""
+        if self._conn is not None:
+            return self._conn
+
+        is_new = not os.path.exists(self.db_file)
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " lang TEXT NOT NULL,"
+            " phrase TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " PRIMARY KEY (lang, phrase)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.commit()
+        self._conn = conn
+
+        if is_new:
+            self._insert_entries(conn, BUILTIN_ENTRIES.items())
+        self._max_phrase = {
+            key[len('max_phrase_'):]: int(value)
+            for key, value in conn.execute("SELECT key, value FROM meta WHERE key LIKE 'max_phrase_%'")
+        }
+        return conn
+
+    @staticmethod
+    def _phrase_length(lang, phrase):
+        """词组长度：英文按单词数，中文按字数"""
+        return len(phrase.split()) if lang == 'en' else len(phrase)
+
+    def _insert_entries(self, conn, entries, batch_size=10000):
+        """
+        写入英文词条及其中文反查词条（调用方需持有锁）
+
+        Args:
+            entries: (英文词组, 中文释义) 的可迭代对象，可以是生成器
+        """
+        max_phrase = dict(self._max_phrase)
+        batch = []
+        reverse_batch = []
+        count = 0
+
+        def flush():
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (lang, phrase, translation) VALUES (?, ?, ?)", batch
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO entries (lang, phrase, translation) VALUES (?, ?, ?)", reverse_batch
+            )
+            batch.clear()
+            reverse_batch.clear()
+
+        for phrase, translation in entries:
+            phrase = ' '.join(phrase.lower().split())
+            translation = translation.strip()
+            if not phrase or not translation:
+                continue
+            batch.append(('en', phrase, translation))
+            max_phrase['en'] = max(max_phrase.get('en', 1), self._phrase_length('en', phrase))
+
+            # 第一个释义作为中文反查的词条（只保留第一次出现的）
+            zh = re.split(r'[,，;；/]', translation)[0].strip()
+            if zh and len(zh) <= 8:
+                reverse_batch.append(('zh', zh, phrase))
+                max_phrase['zh'] = max(max_phrase.get('zh', 1), self._phrase_length('zh', zh))
+
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch or reverse_batch:
+            flush()
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(f"max_phrase_{lang}", str(length)) for lang, length in max_phrase.items()]
+        )
+        conn.commit()
+        self._max_phrase = max_phrase
+        self._memo.clear()
+        return count
+
+    def import_tsv(self, path):
+        """
+        从制表符分隔的文件导入词条（每行: 英文词组<TAB>中文释义），逐行读取
+
+        Returns:
+            导入的词条数
+        """
+        def read_entries():
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) >= 2:
+                        yield parts[0], parts[1]
+
+        with self._lock:
+            return self._insert_entries(self._connect(), read_entries())
+
+    def lookup(self, phrase, lang='en'):
+        """查询单个词组，找不到时返回None"""
+        key = (lang, phrase)
+        if key in self._memo:
+            return self._memo[key]
+
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT translation FROM entries WHERE lang=? AND phrase=?", key
+            ).fetchone()
+        result = row[0] if row else None
+
+        if len(self._memo) >= self.max_memo:
+            self._memo.clear()
+        self._memo[key] = result
+        return result
+
+    def segment(self, text, lang='en'):
+        """
+        最长匹配分词并逐段翻译
+
+        Returns:
+            [(原文片段, 译文或None)] 列表
+        """
+        with self._lock:
+            self._connect()
+        max_phrase = self._max_phrase.get(lang, 1)
+
+        if lang == 'en':
+            tokens = EN_TOKEN.findall(text)
+            words = [token.lower() for token in tokens]
+        else:
+            tokens = [char for char in text if not char.isspace()]
+            words = tokens
+
+        segments = []
+        i = 0
+        while i < len(tokens):
+            for j in range(min(len(tokens), i + max_phrase), i, -1):
+                phrase = ' '.join(words[i:j]) if lang == 'en' else ''.join(words[i:j])
+                translation = self.lookup(phrase, lang)
+                if translation is not None:
+                    source = ' '.join(tokens[i:j]) if lang == 'en' else phrase
+                    segments.append((source, translation))
+                    i = j
+                    break
+            else:
+                segments.append((tokens[i], None))
+                i += 1
+        return segments
+
+    def translate(self, text, from_lang='en', to_lang='zh'):
+        """
+        离线翻译，逐词（词组）翻译后拼接
+
+        Returns:
+            译文；一个词都没查到时返回None
+        """
+        if from_lang not in ('en', 'zh'):
+            return None
+        segments = self.segment(text.strip(), from_lang)
+        if not any(translation for _, translation in segments):
+            return None
+
+        if to_lang == 'en':
+            # 英文单词之间用空格分隔
+            return ' '.join(translation or source for source, translation in segments)
+
+        # 中文之间不加空格，没翻译出来的英文单词两边留空格
+        parts = []
+        for source, translation in segments:
+            if translation is not None:
+                parts.append(translation)
+            elif source[0].isalnum():
+                parts.append(f" {source} ")
+            else:
+                parts.append(source)
+        return re.sub(r' {2,}', ' ', ''.join(parts)).strip()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def main():
+    # 用法: python offline_dictionary.py words.tsv [offline_dict.db]
+    if len(sys.argv) < 2:
+        print("用法: python offline_dictionary.py 词条文件.tsv [词典数据库]")
+        return
+    dictionary = OfflineDictionary(*sys.argv[2:3])
+    count = dictionary.import_tsv(sys.argv[1])
+    dictionary.close()
+    print(f"导入了 {count} 个词条")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import re
+import threading
+
+# 同时按 / 和 \ 切分，Windows和Linux的路径都能处理
+PATH_SEPARATOR = re.compile(r'[\\/]+')
+
+def split_path(path):
+    """
+    把路径切成各级名字
+
+    绝对路径的第一段是根（"/" 或 "c:"），所以 /a 和相对路径 a 不会混在一起
+    """
+    parts = PATH_SEPARATOR.split(path)
+    if path[:1] in ('/', '\\'):
+        parts[0] = '/'
+    return [part for part in parts if part]
+
+class _Node:
+    __slots__ = ('children', 'key')
+
+    def __init__(self):
+        self.children = {}
+        # 这一级正好有注释时，注释在存储里的键
+        self.key = None
+
+class PathTrie:
+    def __init__(self):
+        """
+        有注释的路径组成的前缀树（按路径的每一级建节点）
+
+        查询任意文件或子文件夹时，沿着路径往下走就能找到所有带注释的上级文件夹，
+        耗时只和路径的深度有关，和注释总数无关
+        """
+        self._lock = threading.Lock()
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key):
+        """添加一个有注释的路径"""
+        parts = split_path(key)
+        if not parts:
+            return
+        with self._lock:
+            node = self._root
+            for part in parts:
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = _Node()
+                node = child
+            if node.key is None:
+                self._size += 1
+            node.key = key
+
+    def remove(self, key):
+        """删除一个路径，顺便删掉不再需要的空节点"""
+        parts = split_path(key)
+        with self._lock:
+            trail = [self._root]
+            for part in parts:
+                child = trail[-1].children.get(part)
+                if child is None:
+                    return
+                trail.append(child)
+            node = trail[-1]
+            if node.key is None:
+                return
+            node.key = None
+            self._size -= 1
+            for parent, part in zip(reversed(trail[:-1]), reversed(parts)):
+                child = parent.children[part]
+                if child.key is not None or child.children:
+                    break
+                del parent.children[part]
+
+    def chain(self, path):
+        """
+        path本身及所有上级中有注释的路径
+
+        Returns:
+            从最外层到最里层排列的键列表，没有时为空列表
+        """
+        keys = []
+        with self._lock:
+            node = self._root
+            for part in split_path(path):
+                node = node.children.get(part)
+                if node is None:
+                    break
+                if node.key is not None:
+                    keys.append(node.key)
+        return keys
+
+    def nearest(self, path):
+        """离path最近的有注释的路径（可以是它本身），没有时返回None"""
+        keys = self.chain(path)
+        return keys[-1] if keys else None
+
+    def attach(self, store):
+        """用store里现有的键建前缀树，之后随注释的增删改名自动更新"""
+        store.add_listener(self._on_store_change)
+        for filename, note in store.items():
+            self.add(filename)
+        return self
+
+    def _on_store_change(self, op, filename, value):
+        """注释变化的回调"""
+        if op == 'set':
+            self.add(filename)
+        elif op == 'delete':
+            self.remove(filename)
+        elif op == 'rename':
+            self.remove(filename)
+            self.add(value)
@@ -0,0 +1,505 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+
+def canonical_path(path):
+    """规范化路径：展开 ~、转成绝对路径、解析符号链接，Windows下统一大小写和分隔符"""
+    return os.path.normcase(os.path.realpath(os.path.expanduser(path)))
+
+def file_identity(path):
+    """
+    文件的身份 (设备号, inode号)，文件被移动或改名后不会改变
+
+    Windows下分别是卷序列号和NTFS文件索引
+
+    Returns:
+        (st_dev, st_ino)，文件不存在时返回None
+    """
+    try:
+        result = os.stat(path)
+    except OSError:
+        return None
+    return (result.st_dev, result.st_ino)
+
+class _Inotify:
+    # inotify_add_watch 的事件掩码（见 <sys/inotify.h>）
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        """Linux的inotify（通过ctypes调用libc，不需要额外安装包）"""
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._watches = {}
+        self._directories = {}
+
+    def sync(self, directories):
+        """让监视的目录和directories一致"""
+        for directory in set(self._directories) - directories:
+            wd = self._directories.pop(directory)
+            self._watches.pop(wd, None)
+            self._libc.inotify_rm_watch(self.fd, wd)
+        for directory in directories - set(self._directories):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+                self._directories[directory] = wd
+
+    def wait(self, timeout):
+        """
+        等待事件
+
+        同一次移动的 IN_MOVED_FROM 和 IN_MOVED_TO 带有相同的cookie，两端的目录都在监视中时
+        可以直接知道文件被移到了哪里
+
+        Returns:
+            (有变化的目录集合, 确定被删除的路径集合, {原路径: 新路径})，没有事件时都为空
+        """
+        changed = set()
+        deleted = set()
+        moved_from = {}
+        moves = {}
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + self.EVENT.size <= len(data):
+                wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+                name = data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b'\0')
+                offset += self.EVENT.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    # 事件太多丢掉了一部分，只能全部检查一遍
+                    changed.update(self._directories)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                changed.add(directory)
+                if mask & self.IN_DELETE:
+                    deleted.add(os.path.join(directory, os.fsdecode(name)))
+                elif mask & self.IN_DELETE_SELF:
+                    deleted.add(directory)
+                elif mask & self.IN_MOVED_FROM:
+                    moved_from[cookie] = os.path.join(directory, os.fsdecode(name))
+                elif mask & self.IN_MOVED_TO and cookie in moved_from:
+                    moves[moved_from.pop(cookie)] = os.path.join(directory, os.fsdecode(name))
+                if mask & self.IN_IGNORED:
+                    # 目录本身被删除或移走，监视已经失效
+                    self._watches.pop(wd, None)
+                    self._directories.pop(directory, None)
+        return changed, deleted, moves
+
+    def close(self):
+        os.close(self.fd)
+
+class PathWatcher:
+    def __init__(self, store, identity_file, interval=5.0, orphan_ttl=7 * 24 * 3600, delete_grace=2.0):
+        """
+        让以绝对路径为键的注释跟着文件走
+
+        记录每个有注释的路径的 (设备号, inode号)，在后台线程里监视它们所在的目录。
+        文件被移动或改名后，在有变化的目录里按inode找到新路径并把注释移过去。
+
+        inotify报告的移动（移到同一级或上一级目录也能报告）直接按新路径重新关联；
+        其它找不到的文件先记为"走失"：它可能被删除了，也可能被移到了没有注释的目录里，
+        会在原来的目录、上一级目录和同级的目录里找，之后在任何有变化的目录里出现也会重新关联。inotify明确报告删除的文件过delete_grace秒
+        还没有重新出现才删除注释（很多编辑器保存时先删除再新建文件，两个事件可能不在同一批里），
+        其它走失超过orphan_ttl秒的才删除。
+
+        Linux下用inotify等待目录变化，其它系统每隔interval秒检查一次各个目录的修改时间，
+        两种方式都只扫描有变化的目录，不会重新扫描整个目录树
+
+        Args:
+            store: NotesStore 或 SqliteNotesStore
+            identity_file: 保存路径身份的文件，程序没运行时改名的文件下次启动也能找回
+            interval: 轮询间隔（秒）
+            orphan_ttl: 走失的文件过多久删除注释（秒）
+            delete_grace: 确定被删除的文件过多久删除注释（秒）
+        """
+        self.store = store
+        self.identity_file = identity_file
+        self.interval = interval
+        self.orphan_ttl = orphan_ttl
+        self.delete_grace = delete_grace
+
+        self._lock = threading.Lock()
+        # 路径 -> (设备号, inode号)，还不知道时为None
+        self._identities = {}
+        # 目录 -> 其中有注释的路径集合
+        self._directories = {}
+        self._directory_mtimes = {}
+        # 需要在下一轮检查的目录（新加了注释等）
+        self._dirty = set()
+        # 走失的路径 -> 发现走失的时间
+        self._orphans = {}
+        # inotify报告删除的路径 -> 报告的时间
+        self._deleted = {}
+        # 上次确认各个路径都还在的时间（保存身份文件的时间），启动时发现走失的文件从这个时间算起
+        self._last_seen = time.time()
+        self._identities_changed = False
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.store.add_listener(self._on_store_change)
+
+    def start(self):
+        """启动后台监视线程"""
+        self._thread = threading.Thread(target=self._run, name="notes-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止监视并保存路径身份"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _track(self, path, identity=None):
+        """开始跟踪一个路径（调用方需持有锁）"""
+        if not os.path.isabs(path):
+            return
+        self._identities[path] = identity
+        directory = os.path.dirname(path)
+        self._directories.setdefault(directory, set()).add(path)
+        self._dirty.add(directory)
+
+    def _untrack(self, path):
+        """不再跟踪一个路径，返回它的身份（调用方需持有锁）"""
+        identity = self._identities.pop(path, None)
+        self._orphans.pop(path, None)
+        self._deleted.pop(path, None)
+        directory = os.path.dirname(path)
+        paths = self._directories.get(directory)
+        if paths is not None:
+            paths.discard(path)
+            if not paths:
+                del self._directories[directory]
+                self._directory_mtimes.pop(directory, None)
+        self._identities_changed = True
+        return identity
+
+    def _on_store_change(self, op, filename, value):
+        """注释变化的回调（在修改注释的线程中调用）"""
+        with self._lock:
+            if op == 'set':
+                if filename not in self._identities:
+                    self._track(filename)
+            elif op == 'delete':
+                self._untrack(filename)
+            elif op == 'rename':
+                identity = self._untrack(filename)
+                self._track(value, identity)
+                self._identities_changed = True
+
+    def _load_identities(self):
+        """读取上次保存的路径身份"""
+        self._track_all()
+        if not os.path.exists(self.identity_file):
+            return
+        try:
+            with open(self.identity_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except Exception as e:
+            print(f"读取路径身份文件失败了: {e}")
+            return
+        with self._lock:
+            self._last_seen = saved.get('saved_at', self._last_seen)
+            for path, (device, inode, lost_since) in saved.get('paths', {}).items():
+                if path in self._identities:
+                    self._identities[path] = (device, inode)
+                    if lost_since is not None:
+                        self._orphans[path] = lost_since
+
+    def _track_all(self):
+        """跟踪存储里所有以绝对路径为键的注释"""
+        items = self.store.items()
+        with self._lock:
+            for filename, note in items:
+                if filename not in self._identities:
+                    self._track(filename)
+
+    def _save_identities(self):
+        """保存路径身份（先写临时文件再替换）"""
+        with self._lock:
+            saved = {
+                'saved_at': time.time(),
+                'paths': {
+                    path: [identity[0], identity[1], self._orphans.get(path)]
+                    for path, identity in self._identities.items() if identity
+                }
+            }
+            self._identities_changed = False
+        temp_file = self.identity_file + ".tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False)
+            os.replace(temp_file, self.identity_file)
+        except Exception as e:
+            print(f"保存路径身份文件失败了: {e}")
+
+    def _watched_directories(self):
+        """inotify要监视的目录：有注释的目录和它们的上一级目录（文件被移到上一级或同级目录时也能收到事件）"""
+        with self._lock:
+            directories = set(self._directories)
+        return directories | {os.path.dirname(directory) for directory in directories}
+
+    def _follow_moves(self, moves):
+        """
+        按inotify报告的移动重新关联注释
+
+        Args:
+            moves: {原路径: 新路径}
+        """
+        for old_path, new_path in moves.items():
+            with self._lock:
+                tracked = old_path in self._identities
+                known = self._identities.get(old_path)
+            if not tracked and not self._descendants(old_path):
+                continue
+            new_path = canonical_path(new_path)
+            # 确认一下新路径上还是原来那个文件（移动之后可能马上又被改名或替换）
+            if known is not None and file_identity(new_path) != known:
+                continue
+            self._relink(old_path, new_path)
+
+    @staticmethod
+    def _neighbourhood(directory):
+        """走失的文件可能被移到的地方：原来的目录、上一级目录和同级的各个目录"""
+        parent = os.path.dirname(directory)
+        directories = {directory, parent}
+        try:
+            with os.scandir(parent) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.add(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return directories
+
+    def _changed_directories(self):
+        """轮询：修改时间变了的目录（目录里有文件新建、删除或改名时，目录的修改时间会变）"""
+        with self._lock:
+            directories = list(self._directories)
+        changed = set()
+        for directory in directories:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if self._directory_mtimes.get(directory, -1) != mtime:
+                self._directory_mtimes[directory] = mtime
+                changed.add(directory)
+        return changed
+
+    def _take_dirty(self):
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+        return dirty
+
+    def check(self, directories, deleted=(), initial=False):
+        """
+        检查这些目录里有注释的路径
+
+        Args:
+            directories: 要检查的目录
+            deleted: 确定已经被删除的路径（inotify报告的），delete_grace秒后还不在才删除注释
+            initial: 是否是启动后的第一次检查（只在走失文件原来的目录附近找它们）
+        """
+        now = time.time()
+        lost_time = self._last_seen if initial else now
+        # 这次才发现走失的路径，要在原来目录附近的目录里找
+        newly_lost = set()
+        with self._lock:
+            for path in deleted:
+                if path in self._identities:
+                    self._deleted.setdefault(path, now)
+        for directory in directories:
+            with self._lock:
+                paths = list(self._directories.get(directory, ()))
+            for path in paths:
+                identity = file_identity(path)
+                with self._lock:
+                    if path not in self._identities:
+                        continue
+                    known = self._identities[path]
+                    if identity is None:
+                        if known is not None and path not in self._orphans:
+                            self._orphans[path] = lost_time
+                            newly_lost.add(path)
+                            self._identities_changed = True
+                    elif identity != known or path in self._orphans:
+                        # 第一次看到这个文件，或者编辑器保存时替换成了新文件，注释留在原来的路径上
+                        self._identities[path] = identity
+                        self._orphans.pop(path, None)
+                        self._identities_changed = True
+
+        with self._lock:
+            # 重新出现了的文件不用再删除
+            for path in [path for path in self._deleted if path not in self._orphans]:
+                del self._deleted[path]
+            # 身份 -> 走失的路径
+            lost = {self._identities[path]: path for path in self._orphans}
+        if not lost:
+            return
+
+        search_directories = set()
+        for path in lost.values():
+            if initial or path in newly_lost:
+                search_directories |= self._neighbourhood(os.path.dirname(path))
+            else:
+                search_directories.add(os.path.dirname(path))
+        if not initial:
+            # 在同一时间有变化的其它目录里找被移过去的文件
+            search_directories |= set(directories)
+        for directory in search_directories:
+            if not lost:
+                break
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    result = os.stat(entry.path)
+                except OSError:
+                    continue
+                path = lost.get((result.st_dev, result.st_ino))
+                if path is None:
+                    continue
+                # inode号会被新文件重用：走失之后才修改过的文件不是原来那个
+                # （目录的修改时间会随里面的文件变化，不检查）
+                with self._lock:
+                    lost_since = self._orphans.get(path, now)
+                if stat.S_ISDIR(result.st_mode) or result.st_mtime <= lost_since:
+                    del lost[(result.st_dev, result.st_ino)]
+                    self._relink(path, canonical_path(entry.path))
+
+        for path in lost.values():
+            with self._lock:
+                lost_since = self._orphans.get(path)
+                deleted_at = self._deleted.get(path)
+            if lost_since is None:
+                continue
+            if deleted_at is not None and now - deleted_at >= self.delete_grace:
+                # 等过了宽限时间，再确认一次文件确实不在
+                if file_identity(path) is None:
+                    self._prune(path)
+            elif now - lost_since > self.orphan_ttl:
+                self._prune(path)
+
+    def _expired_deletions(self):
+        """报告删除已经超过宽限时间、需要再检查一次的路径所在的目录"""
+        now = time.time()
+        with self._lock:
+            return {
+                os.path.dirname(path) for path, deleted_at in self._deleted.items()
+                if now - deleted_at >= self.delete_grace
+            }
+
+    def _descendants(self, path):
+        """已跟踪的、在path目录下面的路径"""
+        prefix = os.path.join(path, '')
+        with self._lock:
+            return [other for other in self._identities if other.startswith(prefix)]
+
+    def _relink(self, old_path, new_path):
+        """文件被移动或改名：把注释（包括目录下面各个文件的注释）移到新路径"""
+        if old_path == new_path:
+            return
+        for descendant in self._descendants(old_path):
+            self.store.rename(descendant, new_path + descendant[len(old_path):])
+        self.store.rename(old_path, new_path)
+
+    def _prune(self, path):
+        """文件被删除：删除它（以及它下面各个文件）的注释"""
+        for descendant in self._descendants(path):
+            self.store.delete(descendant)
+        self.store.delete(path)
+
+    def _run(self):
+        """后台监视线程"""
+        inotify = None
+        if sys.platform.startswith('linux'):
+            try:
+                inotify = _Inotify()
+            except Exception as e:
+                print(f"无法使用inotify，改为定时检查: {e}")
+
+        try:
+            self._load_identities()
+            if inotify is None:
+                # 记下各个目录现在的修改时间
+                self._changed_directories()
+            with self._lock:
+                directories = set(self._directories)
+            self._take_dirty()
+            self.check(directories, initial=True)
+        except Exception as e:
+            print(f"检查文件变化时出错了: {e}")
+        last_sweep = time.monotonic()
+
+        try:
+            while not self._stop.is_set():
+                # 每一轮单独处理异常（目录暂时读不了等），一次出错不会让监视线程退出
+                try:
+                    last_sweep = self._watch_once(inotify, last_sweep)
+                except Exception as e:
+                    print(f"监视文件变化时出错了: {e}")
+                    self._stop.wait(self.interval)
+        finally:
+            if inotify is not None:
+                inotify.close()
+            if self._identities_changed:
+                self._save_identities()
+
+    def _watch_once(self, inotify, last_sweep):
+        """
+        等待一轮目录变化并检查
+
+        Returns:
+            上次检查走失太久的文件的时间
+        """
+        if inotify is not None:
+            inotify.sync(self._watched_directories())
+            # 等待时间不能太长，否则退出时要等很久
+            changed, deleted, moves = inotify.wait(min(self.interval, 0.5))
+            self._follow_moves(moves)
+        else:
+            self._stop.wait(self.interval)
+            changed, deleted = self._changed_directories(), set()
+        changed |= self._take_dirty()
+        changed |= self._expired_deletions()
+        if changed or deleted:
+            self.check(changed, deleted)
+        elif self._orphans and time.monotonic() - last_sweep > 3600:
+            # 每小时检查一次走失太久的文件
+            self.check((), initial=True)
+            last_sweep = time.monotonic()
+        if self._identities_changed:
+            self._save_identities()
+        return last_sweep
\ No newline at end of file
@@ -0,0 +1,68 @@
+import threading
+
+class _Call:
+    """一次正在进行的调用"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        """
+        合并重复的并发调用
+
+        同一个key的调用还没结束时，后来的调用不再重复执行，
+        而是等第一个调用结束后拿到同一个结果（或同一个异常）。
+        调用结束后马上忘掉，之后相同的key会重新执行
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+        # 被合并掉的调用次数（用于统计）
+        self.shared_count = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        执行 func(*args, **kwargs)，相同key的并发调用只执行一次
+
+        Args:
+            key: 可哈希的调用标识，例如 (文本, 源语言, 目标语言)
+            func: 真正执行的函数
+
+        Returns:
+            func的返回值
+
+        Raises:
+            func抛出的异常，所有等待者都会收到同一个异常
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared_count += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """正在进行的调用数"""
+        with self._lock:
+            return len(self._calls)
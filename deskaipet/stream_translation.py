@@ -0,0 +1,199 @@
+import re
+import threading
+
+# 一个句子：到中英文句末标点（及其后的空白）为止，或者是行尾没有标点的部分
+SENTENCE = re.compile(r'[^。！？；!?;.]*[。！？；!?;.]+\s*|[^。！？；!?;.]+')
+
+def _split_long_line(line, max_bytes):
+    """把超过max_bytes的一行按句子切开，单个句子仍然过长时按字节硬切"""
+    piece = ''
+    piece_bytes = 0
+    for sentence in SENTENCE.findall(line):
+        sentence_bytes = len(sentence.encode('utf-8'))
+        if piece and piece_bytes + sentence_bytes > max_bytes:
+            yield piece
+            piece = ''
+            piece_bytes = 0
+        if sentence_bytes > max_bytes:
+            # 没有标点的超长句子，逐字累积到上限为止
+            for char in sentence:
+                char_bytes = len(char.encode('utf-8'))
+                if piece_bytes + char_bytes > max_bytes:
+                    yield piece
+                    piece = ''
+                    piece_bytes = 0
+                piece += char
+                piece_bytes += char_bytes
+        else:
+            piece += sentence
+            piece_bytes += sentence_bytes
+    if piece:
+        yield piece
+
+def iter_text_chunks(lines, max_bytes):
+    """
+    把逐行读入的文本切成不超过max_bytes字节的块
+
+    优先在段落（空行）处切分，其次在行尾切分，单行过长时再按句子切分。
+    每次只在内存中保留一个块，输入多大都不影响内存占用
+
+    Args:
+        lines: 可迭代的文本行（例如打开的文件对象），每行可以带换行符
+        max_bytes: 每块的最大UTF-8字节数
+
+    Yields:
+        文本块；以换行符结尾的块表示在行尾切开，否则是同一行的一部分
+    """
+    buffer = []
+    size = 0
+    for line in lines:
+        line_bytes = len(line.encode('utf-8'))
+
+        if line_bytes > max_bytes:
+            if buffer:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+            content = line.rstrip('\n')
+            pieces = list(_split_long_line(content, max_bytes))
+            for piece in pieces[:-1]:
+                yield piece
+            if pieces:
+                yield pieces[-1] + line[len(content):]
+            continue
+
+        if buffer and size + line_bytes > max_bytes:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+
+        buffer.append(line)
+        size += line_bytes
+
+        # 段落结束且块已经不小了，就在这里切开
+        if not line.strip() and size >= max_bytes // 2:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield ''.join(buffer)
+
+class StreamingTranslation:
+    def __init__(self, runner, chunks, translate_func, on_chunk, on_done=None, on_error=None,
+                 max_in_flight=2):
+        """
+        流式翻译
+
+        最多同时有max_in_flight个后台任务，每个任务从chunks中读取下一块文本并翻译，
+        读文件和解码都在后台线程里进行（大文件、网络上的慢文件也不会卡住界面）。
+        译文按原来的顺序通过on_chunk交给主线程；已经翻译完、还在等前面的块的译文也算在
+        max_in_flight里，内存占用不随输入变大
+
+        Args:
+            runner: TaskRunner实例
+            chunks: 文本块的迭代器（见iter_text_chunks），只会在后台线程中依次读取
+            translate_func: 在后台线程中翻译一个块的函数，失败时抛出异常
+            on_chunk: 主线程回调 on_chunk(index, translated)
+            on_done: 全部完成后的主线程回调 on_done(chunk_count)
+            on_error: 出错后的主线程回调 on_error(exception)
+            max_in_flight: 同时翻译的最大块数
+        """
+        self.runner = runner
+        self.chunks = iter(chunks)
+        self.translate_func = translate_func
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.on_error = on_error
+        self.max_in_flight = max_in_flight
+
+        # 任务编号 -> Future（主线程）
+        self.in_flight = {}
+        self.next_task = 0
+        # 块序号 -> 译文，等前面的块都输出了再输出（主线程）
+        self.ready = {}
+        self.next_emit = 0
+        self.exhausted = False
+        self.finished = False
+
+        # 后台线程依次读取chunks，读到的块按顺序编号
+        self._read_lock = threading.Lock()
+        self._read_count = 0
+
+    def start(self):
+        """开始翻译"""
+        self._fill()
+        return self
+
+    def cancel(self):
+        """取消翻译，已经发出的请求结果会被丢弃"""
+        if self.finished:
+            return
+        self.finished = True
+        for future in self.in_flight.values():
+            self.runner.cancel(future)
+        self.in_flight.clear()
+        self.ready.clear()
+
+    def _fill(self):
+        """补充后台任务，直到达到并发上限"""
+        while (not self.finished and not self.exhausted
+               and len(self.in_flight) + len(self.ready) < self.max_in_flight):
+            task = self.next_task
+            self.next_task += 1
+            self.in_flight[task] = self.runner.submit(
+                self._read_and_translate,
+                callback=lambda result, task=task: self._on_translated(task, result),
+                error_callback=self._fail
+            )
+
+        if not self.finished and self.exhausted and not self.in_flight:
+            self.finished = True
+            if self.on_done:
+                self.on_done(self._read_count)
+
+    def _read_and_translate(self):
+        """
+        读取下一块并翻译（在后台线程中运行）
+
+        Returns:
+            (块序号, 译文)；没有更多的块（或已经取消）时返回None
+        """
+        with self._read_lock:
+            if self.finished:
+                return None
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                return None
+            index = self._read_count
+            self._read_count += 1
+        return index, self.translate_func(chunk)
+
+    def _on_translated(self, task, result):
+        """一个后台任务完成（主线程）"""
+        if self.finished:
+            return
+        self.in_flight.pop(task, None)
+        if result is None:
+            self.exhausted = True
+        else:
+            index, translated = result
+            self.ready[index] = translated
+
+        # 按顺序输出已经完成的块
+        while self.next_emit in self.ready:
+            self.on_chunk(self.next_emit, self.ready.pop(self.next_emit))
+            self.next_emit += 1
+
+        self._fill()
+
+    def _fail(self, error):
+        """出错后停止翻译"""
+        if self.finished:
+            return
+        self.cancel()
+        if self.on_error:
+            self.on_error(error)
+        else:
+            print(f"流式翻译出错了: {error}")
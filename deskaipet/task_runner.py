@@ -0,0 +1,132 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class TaskRunner:
+    # 有任务在执行时，主线程检查结果队列的间隔（毫秒）
+    POLL_INTERVAL = 30
+
+    def __init__(self, root, max_workers=2):
+        """
+        后台任务执行器
+
+        耗时的任务（网络请求等）放到固定大小的线程池里执行。
+        后台线程只把结束的任务放进队列，不调用任何Tk方法；
+        主线程用 root.after 定时取出结果并回调，界面不会被卡住。
+        没有任务时不检查队列，不会多出空闲的唤醒
+
+        Args:
+            root: tkinter根窗口，用于在主线程中检查结果
+            max_workers: 线程池的最大线程数
+        """
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pet-task")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._cancelled = set()
+        self._done = queue.SimpleQueue()
+        self._poll_job = None
+        self._closed = False
+
+    def submit(self, func, *args, callback=None, error_callback=None, **kwargs):
+        """
+        提交一个后台任务（在主线程中调用）
+
+        Args:
+            func: 在后台线程中执行的函数
+            callback: 成功后在主线程中调用 callback(result)
+            error_callback: 出错后在主线程中调用 error_callback(exception)
+
+        Returns:
+            concurrent.futures.Future，可以传给 cancel() 取消
+        """
+        future = self.executor.submit(func, *args, **kwargs)
+        with self._lock:
+            self._pending.add(future)
+        # 完成回调在后台线程（或取消任务的线程）中运行，只能放进队列
+        future.add_done_callback(lambda f: self._done.put((f, callback, error_callback)))
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.POLL_INTERVAL, self._poll)
+        return future
+
+    def _poll(self):
+        """在主线程中取出所有已经结束的任务并分发结果，还有任务没结束时继续检查"""
+        self._poll_job = None
+        while True:
+            try:
+                future, callback, error_callback = self._done.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._deliver(future, callback, error_callback)
+            except Exception as e:
+                print(f"处理后台任务结果出错了: {e}")
+        with self._lock:
+            pending = bool(self._pending)
+        if pending and not self._closed:
+            self._poll_job = self.root.after(self.POLL_INTERVAL, self._poll)
+
+    def _deliver(self, future, callback, error_callback):
+        """在主线程中分发结果"""
+        cancelled = self._forget(future)
+        if cancelled or future.cancelled():
+            return
+
+        error = future.exception()
+        if error is not None:
+            if error_callback:
+                error_callback(error)
+            else:
+                print(f"后台任务出错了: {error}")
+            return
+
+        if callback:
+            callback(future.result())
+
+    def _forget(self, future):
+        """从记录中移除任务，返回它是否已被取消"""
+        with self._lock:
+            self._pending.discard(future)
+            if future in self._cancelled:
+                self._cancelled.discard(future)
+                return True
+            return False
+
+    def cancel(self, future):
+        """
+        取消任务
+
+        还没开始的任务直接取消；已经在执行的任务无法中断，
+        但它的结果会被丢弃，不会再回调
+        """
+        if future.cancel():
+            return
+        with self._lock:
+            if future in self._pending:
+                self._cancelled.add(future)
+
+    def cancel_all(self):
+        """取消所有未完成的任务"""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            self.cancel(future)
+
+    def has_pending(self):
+        """检查是否还有未完成的任务"""
+        with self._lock:
+            return len(self._pending - self._cancelled) > 0
+
+    def shutdown(self):
+        """关闭线程池，放弃所有未完成的任务"""
+        if self._closed:
+            return
+        self._closed = True
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._poll_job is not None:
+            try:
+                self.root.after_cancel(self._poll_job)
+            except Exception as e:
+                print(f"停止检查后台任务失败: {e}")
+            self._poll_job = None
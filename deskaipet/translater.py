@@ -6,9 +6,9 @@ import json
 import os
 from PIL import Image, ImageTk
 import requests
-import hashlib
 import uuid
-import random
+from baidu_client import BaiduApiError
+from translation_backends import BaiduBackend
 
 class Translater:
     def __init__(
@@ -39,34 +39,13 @@ class Translater:
         if self.baidu_appid == '您的百度翻译APPID' or self.baidu_key == '您的百度翻译密钥':
             return self.fallback_translate(text)
         
-        salt = str(random.randint(32768, 65536))
-        sign = self.baidu_appid + text + salt + self.baidu_key
-        sign = hashlib.md5(sign.encode()).hexdigest()
-        
-        url = 'https://fanyi-api.baidu.com/api/trans/vip/translate'
-        params = {
-            'q': text,
-            'from': from_lang,
-            'to': to_lang,
-            'appid': self.baidu_appid,
-            'salt': salt,
-            'sign': sign
-        }
-        
         try:
-            response = requests.get(url, params=params, timeout=10)
-            result = response.json()
-            
-            if 'error_code' in result:
-                error_msg = result.get('error_msg', '未知错误')
-                raise Exception(f"百度翻译API错误: {error_msg}")
-            
-            if 'trans_result' in result:
-                translated_text = '\n'.join([item['dst'] for item in result['trans_result']])
-                return translated_text
-            else:
-                raise Exception("找不到翻译结果")
-                
+            # 和翻译管理器共用同一个百度翻译后端实现（连接复用、限速和限频重试）
+            backend = BaiduBackend(self.baidu_appid, self.baidu_key)
+            return backend.translate(text, from_lang, to_lang)
+        
+        except BaiduApiError as e:
+            raise Exception(f"百度翻译API错误: {e.error_msg}")
         except requests.exceptions.RequestException as e:
             raise Exception(f"网络请求失败: {str(e)}")
         except Exception as e:
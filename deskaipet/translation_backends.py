@@ -0,0 +1,230 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from baidu_client import BaiduClient, BAIDU_TRANSLATE_URL, get_session
+
+class BackendError(Exception):
+    """翻译后端无法给出结果"""
+
+class TranslationBackend(ABC):
+    # 在配置文件 backends 列表里使用的名字
+    name = "base"
+    # 只在其它后端都不可用时才使用（例如离线词典，速度快但质量一般）
+    last_resort = False
+    # 结果是否可以写入翻译缓存
+    cacheable = True
+
+    def is_configured(self):
+        """后端是否已经配置好，可以使用"""
+        return True
+
+    @abstractmethod
+    def translate(self, text, from_lang, to_lang):
+        """
+        翻译一条文本（每个后端都必须实现，没有实现的后端在创建时就会报错）
+
+        Raises:
+            BackendError 或网络异常: 无法翻译时
+        """
+
+    def translate_batch(self, texts, from_lang, to_lang):
+        """批量翻译，默认逐条调用translate"""
+        return [self.translate(text, from_lang, to_lang) if text.strip() else '' for text in texts]
+
+class BaiduBackend(TranslationBackend):
+    name = "baidu"
+
+    def __init__(self, appid='', key='', qps=1, url=BAIDU_TRANSLATE_URL):
+        """百度翻译API"""
+        self.qps = qps
+        self.url = url
+        self.client = None
+        self.set_credentials(appid, key)
+
+    def set_credentials(self, appid, key):
+        """更新APPID和密钥"""
+        self.appid = appid
+        self.key = key
+
+    def is_configured(self):
+        return bool(self.appid and self.key)
+
+    def _get_client(self):
+        """获取当前配置对应的API客户端，配置改变后重新创建"""
+        client = self.client
+        if client is None or client.appid != self.appid or client.key != self.key:
+            client = BaiduClient(self.appid, self.key, qps=self.qps, url=self.url)
+            self.client = client
+        return client
+
+    def translate(self, text, from_lang, to_lang):
+        return self.translate_batch([text], from_lang, to_lang)[0]
+
+    def translate_batch(self, texts, from_lang, to_lang):
+        return self._get_client().translate_batch(texts, from_lang, to_lang)
+
+class OfflineBackend(TranslationBackend):
+    name = "offline"
+    last_resort = True
+    cacheable = False
+
+    def __init__(self, dictionary):
+        """
+        离线词典
+
+        Args:
+            dictionary: OfflineDictionary实例
+        """
+        self.dictionary = dictionary
+
+    def translate(self, text, from_lang, to_lang):
+        result = self.dictionary.translate(text, from_lang, to_lang)
+        if result is None:
+            raise BackendError("离线词典里没有找到这些词")
+        return result
+
+class HttpBackend(TranslationBackend):
+    name = "http"
+
+    # 百度的语言代码和常见开源翻译服务（ISO 639-1）不同的部分
+    LANGUAGE_CODES = {'jp': 'ja', 'kor': 'ko'}
+
+    def __init__(self, url='', timeout=10):
+        """
+        本地HTTP翻译服务（兼容LibreTranslate的接口，也可以是测试用的替身服务器）
+
+        请求: POST {"q": 文本, "source": 源语言, "target": 目标语言, "format": "text"}
+        返回: {"translatedText": 译文}
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def is_configured(self):
+        return bool(self.url)
+
+    def translate(self, text, from_lang, to_lang):
+        response = get_session().post(self.url, json={
+            'q': text,
+            'source': self.LANGUAGE_CODES.get(from_lang, from_lang),
+            'target': self.LANGUAGE_CODES.get(to_lang, to_lang),
+            'format': 'text'
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        if 'translatedText' not in result:
+            raise BackendError(result.get('error', "找不到翻译结果"))
+        return result['translatedText']
+
+def create_backends(names, config, offline_dict=None):
+    """
+    按配置创建后端
+
+    Args:
+        names: 后端名字列表，例如 ["baidu", "http", "offline"]
+        config: 配置字典（translation_config.json的内容）
+        offline_dict: OfflineDictionary实例，使用offline后端时需要
+    """
+    backends = []
+    for name in names:
+        if name == "baidu":
+            backends.append(BaiduBackend(
+                config.get('appid', ''), config.get('key', ''),
+                qps=config.get('qps', 1), url=config.get('baidu_url', BAIDU_TRANSLATE_URL)
+            ))
+        elif name == "http":
+            backends.append(HttpBackend(config.get('http_url', '')))
+        elif name == "offline" and offline_dict is not None:
+            backends.append(OfflineBackend(offline_dict))
+        else:
+            print(f"未知的翻译后端: {name}")
+    return backends
+
+class BackendRouter:
+    def __init__(self, backends, cooldown=30, on_error=None):
+        """
+        翻译后端路由：优先使用最快的健康后端，失败时自动换下一个
+
+        Args:
+            backends: 后端列表，顺序表示还没有测速时的优先级
+            cooldown: 后端出错后暂停使用的秒数
+            on_error: 某个后端出错时的回调 on_error(backend, exception)，在调用线程中执行
+        """
+        self.backends = list(backends)
+        self.cooldown = cooldown
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        # 每个后端的平均延迟（指数移动平均）和暂停到的时间
+        self.latency = {}
+        self.unhealthy_until = {}
+
+    def get(self, name):
+        """按名字查找后端"""
+        for backend in self.backends:
+            if backend.name == name:
+                return backend
+        return None
+
+    def ordered_backends(self):
+        """按可用顺序排列的后端：普通后端按平均延迟排序，保底后端放在最后，暂停中的后端不参与"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                (backend.last_resort, self.latency.get(backend.name, 0.0), index, backend)
+                for index, backend in enumerate(self.backends)
+                if backend.is_configured() and self.unhealthy_until.get(backend.name, 0) <= now
+            ]
+        candidates.sort(key=lambda item: item[:3])
+        return [item[3] for item in candidates]
+
+    def mark_healthy(self, name):
+        """解除后端的暂停状态（例如重新配置之后）"""
+        with self._lock:
+            self.unhealthy_until.pop(name, None)
+
+    def _record_success(self, backend, elapsed):
+        with self._lock:
+            previous = self.latency.get(backend.name)
+            self.latency[backend.name] = elapsed if previous is None else previous * 0.8 + elapsed * 0.2
+            self.unhealthy_until.pop(backend.name, None)
+
+    def _record_failure(self, backend, error):
+        # 词典里查不到只是没有结果，不算后端出故障
+        if not isinstance(error, BackendError):
+            with self._lock:
+                self.unhealthy_until[backend.name] = time.monotonic() + self.cooldown
+        if self.on_error:
+            self.on_error(backend, error)
+
+    def _call(self, method, *args):
+        """依次尝试各个后端，返回 (结果, 后端)"""
+        last_error = None
+        for backend in self.ordered_backends():
+            start = time.perf_counter()
+            try:
+                result = getattr(backend, method)(*args)
+            except Exception as e:
+                self._record_failure(backend, e)
+                last_error = e
+                continue
+            self._record_success(backend, time.perf_counter() - start)
+            return result, backend
+
+        if last_error is None:
+            raise BackendError("没有可用的翻译后端")
+        raise last_error
+
+    def translate(self, text, from_lang, to_lang):
+        """
+        翻译一条文本
+
+        Returns:
+            (译文, 实际使用的后端)
+
+        Raises:
+            最后一个后端的异常；没有可用后端时抛出BackendError
+        """
+        return self._call('translate', text, from_lang, to_lang)
+
+    def translate_batch(self, texts, from_lang, to_lang):
+        """批量翻译，返回 (译文列表, 实际使用的后端)"""
+        return self._call('translate_batch', texts, from_lang, to_lang)
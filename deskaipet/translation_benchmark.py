@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmark_stats import percentile
+from language_detect import choose_language_pair
+from offline_dictionary import OfflineDictionary
+from translation_backends import create_backends
+
+def run_backend(backend, corpus, repeat=1):
+    """
+    把语料逐条交给一个后端翻译，记录每条的延迟
+
+    Args:
+        backend: TranslationBackend实例
+        corpus: [(文本, 源语言, 目标语言)] 列表
+        repeat: 重复轮数
+
+    Returns:
+        统计结果字典
+    """
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, from_lang, to_lang in corpus:
+            begin = time.perf_counter()
+            try:
+                backend.translate(text, from_lang, to_lang)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'backend': backend.name,
+        'requests': len(corpus) * repeat,
+        'ok': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'throughput_per_s': len(latencies) / elapsed if elapsed > 0 else 0.0,
+    }
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """本地替身翻译服务：接口和HttpBackend一致，把文本原样转成大写返回"""
+    protocol_version = 'HTTP/1.1'
+    # 响应头和正文分两次写出，关掉Nagle算法避免每次多等一个延迟确认
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.delay:
+            time.sleep(self.delay)
+        data = json.dumps({'translatedText': str(body.get('q', '')).upper()}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stand_in(delay=0.0):
+    """在后台线程启动替身服务，返回 (server, url)"""
+    handler = type('DelayedStandInHandler', (StandInHandler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/translate"
+
+def load_corpus(path):
+    """读取语料（每行一条），并为每条选择翻译方向"""
+    corpus = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            text = line.strip()
+            if text:
+                corpus.append((text,) + choose_language_pair(text))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description="翻译后端延迟基准测试")
+    parser.add_argument('corpus', help="语料文件，每行一条要翻译的文本")
+    parser.add_argument('--backends', default="baidu,http,offline", help="要测试的后端，逗号分隔")
+    parser.add_argument('--config', default="translation_config.json", help="翻译配置文件")
+    parser.add_argument('--repeat', type=int, default=1, help="语料重复轮数")
+    parser.add_argument('--stand-in', action='store_true', help="启动本地替身服务作为http后端")
+    parser.add_argument('--stand-in-delay', type=float, default=0.0, help="替身服务每次响应前等待的秒数")
+    parser.add_argument('--dict', default="offline_dict.db", help="离线词典数据库")
+    parser.add_argument('--json', help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    if args.stand_in:
+        server, config['http_url'] = start_stand_in(args.stand_in_delay)
+
+    corpus = load_corpus(args.corpus)
+    offline_dict = OfflineDictionary(args.dict)
+    backends = create_backends(args.backends.split(','), config, offline_dict)
+
+    results = []
+    print(f"{'后端':<10}{'成功':>8}{'失败':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}{'条/秒':>12}")
+    for backend in backends:
+        if not backend.is_configured():
+            print(f"{backend.name:<10}没有配置，跳过")
+            continue
+        result = run_backend(backend, corpus, args.repeat)
+        results.append(result)
+        print(f"{result['backend']:<10}{result['ok']:>8}{result['errors']:>8}"
+              f"{result['p50_ms']:>12.3f}{result['p95_ms']:>12.3f}{result['p99_ms']:>12.3f}"
+              f"{result['throughput_per_s']:>12.1f}")
+
+    offline_dict.close()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import time
+import unicodedata
+
+class TranslationCache:
+    def __init__(self, db_file="translation_cache.db", max_entries=5000, ttl=None,
+                 max_text_length=6000):
+        """
+        翻译结果的本地持久化缓存（SQLite）
+
+        Args:
+            db_file: 缓存数据库文件路径
+            max_entries: 最多保存的条目数，超出后按最近最少使用（LRU）淘汰
+            ttl: 条目有效期（秒），None表示永不过期
+            max_text_length: 超过这个长度的文本不缓存
+        """
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_text_length = max_text_length
+
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+
+        # 命中时只记录访问时间，攒够一批再写回数据库，避免每次命中都写盘
+        self._pending_touches = {}
+        self._touch_flush_size = 64
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._init_db()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _init_db(self):
+        """创建缓存表"""
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " text TEXT NOT NULL,"
+            " from_lang TEXT NOT NULL,"
+            " to_lang TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (text, from_lang, to_lang))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def normalize(text):
+        """规范化文本，让只差首尾空白或全半角写法的文本命中同一条缓存"""
+        return unicodedata.normalize('NFKC', text).strip()
+
+    def get(self, text, from_lang, to_lang):
+        """查询缓存，没有命中时返回None"""
+        key = (self.normalize(text), from_lang, to_lang)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM cache WHERE text=? AND from_lang=? AND to_lang=?",
+                key
+            ).fetchone()
+
+            now = time.time()
+            if row is None:
+                self.misses += 1
+                return None
+
+            result, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                # 过期的条目直接删掉
+                self._conn.execute(
+                    "DELETE FROM cache WHERE text=? AND from_lang=? AND to_lang=?", key
+                )
+                self._conn.commit()
+                self._pending_touches.pop(key, None)
+                self._size -= 1
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._pending_touches[key] = now
+            if len(self._pending_touches) >= self._touch_flush_size:
+                self._flush_touches()
+                self._conn.commit()
+            return result
+
+    def put(self, text, from_lang, to_lang, result):
+        """写入缓存"""
+        if not result or len(text) > self.max_text_length:
+            return
+        key = (self.normalize(text), from_lang, to_lang)
+        now = time.time()
+        with self._lock:
+            self._flush_touches()
+            exists = self._conn.execute(
+                "SELECT 1 FROM cache WHERE text=? AND from_lang=? AND to_lang=?", key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (text, from_lang, to_lang, result, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                key + (result, now, now)
+            )
+            if not exists:
+                self._size += 1
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touches(self):
+        """把攒下的访问时间写回数据库（调用方需持有锁）"""
+        if not self._pending_touches:
+            return
+        self._conn.executemany(
+            "UPDATE cache SET last_used=? WHERE text=? AND from_lang=? AND to_lang=?",
+            [(used,) + key for key, used in self._pending_touches.items()]
+        )
+        self._pending_touches.clear()
+
+    def _evict(self):
+        """超出容量时淘汰最久没用过的条目（调用方需持有锁）"""
+        overflow = self._size - self.max_entries
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM cache WHERE rowid IN ("
+            " SELECT rowid FROM cache ORDER BY last_used LIMIT ?)",
+            (overflow,)
+        )
+        self._size -= overflow
+
+    def stats(self):
+        """返回命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': self._size
+            }
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+            self._pending_touches.clear()
+            self._size = 0
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            try:
+                self._flush_touches()
+                self._conn.commit()
+                self._conn.close()
+            except Exception as e:
+                print(f"关闭翻译缓存失败: {e}")
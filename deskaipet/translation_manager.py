@@ -1,10 +1,19 @@
 import tkinter as tk
-from tkinter import simpledialog, messagebox
-import requests
-import random
-import hashlib
+from tkinter import simpledialog, messagebox, filedialog
+import io
 import json
 import os
+from translation_cache import TranslationCache
+from task_runner import TaskRunner
+from baidu_client import BaiduClient, BaiduApiError, BAIDU_TRANSLATE_URL, MAX_QUERY_BYTES
+from stream_translation import StreamingTranslation, iter_text_chunks
+from offline_dictionary import OfflineDictionary
+from language_detect import choose_language_pair, LANGUAGE_NAMES
+from translation_backends import BackendRouter, create_backends
+from single_flight import SingleFlight
+
+# 没有在配置文件里指定 backends 时使用的翻译后端
+DEFAULT_BACKENDS = ["baidu", "offline"]
 
 class TranslationManager:
     def __init__(self, pet_app):
@@ -17,11 +26,47 @@ class TranslationManager:
         self.pet_app = pet_app
         self.config_file = "translation_config.json"
         
+        # 账户的QPS上限（标准版1，高级版10，尊享版100），可以在配置文件里用qps修改
+        self.qps = 1
+        
         # 加载配置
+        self.config = {}
         self.appid, self.key = self._load_config()
         
         # 百度翻译API配置
-        self.url = 'https://fanyi-api.baidu.com/api/trans/vip/translate'
+        self.url = self.config.get('baidu_url', BAIDU_TRANSLATE_URL)
+        
+        # 翻译结果缓存，相同的句子不再重复请求API
+        self.cache = TranslationCache("translation_cache.db")
+        
+        # 离线词典，API没有配置或者连不上时使用（第一次查询时才打开）
+        self.offline_dict = OfflineDictionary("offline_dict.db")
+        
+        # 翻译后端（配置文件里的 backends 选择使用哪些），自动切换到最快的可用后端
+        self.router = BackendRouter(
+            create_backends(self.config.get('backends', DEFAULT_BACKENDS), self.config, self.offline_dict),
+            on_error=self._on_backend_error
+        )
+        
+        # 相同的文本同时被翻译多次时（连点按钮等），只发一次请求，结果大家共用
+        self.flight = SingleFlight()
+        
+        # 网络请求放到后台线程里执行，避免卡住界面和动画
+        self.runner = TaskRunner(self.pet_app.root, max_workers=2)
+        
+        # API配置是否有效：None表示还没验证过，True有效，False无效
+        # 只在启动和配置时验证一次，之后只有真实翻译返回认证错误时才会改成False
+        self.api_valid = None
+        if self.router.get("baidu") and self.appid and self.key:
+            self.runner.submit(
+                self._test_api, self.appid, self.key,
+                callback=self._on_startup_api_tested
+            )
+        
+        # 正在进行的流式翻译（长文本和文件）
+        self.stream = None
+        self.stream_source = None
+        self.stream_output = None
 
     def _load_config(self):
         """从配置文件加载API配置"""
@@ -29,6 +74,13 @@ class TranslationManager:
             if os.path.exists(self.config_file):
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
+                qps = config.get('qps', self.qps)
+                if isinstance(qps, (int, float)) and not isinstance(qps, bool) and qps > 0:
+                    self.qps = qps
+                else:
+                    print(f"配置文件里的qps无效（必须大于0），使用 {self.qps}: {qps}")
+                config['qps'] = self.qps
+                self.config = config
                 return config.get('appid', ''), config.get('key', '')
             else:
                 return '', ''
@@ -39,58 +91,63 @@ class TranslationManager:
     def _save_config(self, appid, key):
         """保存API配置到文件"""
         try:
-            config = {
+            # 保留配置文件里的其它设置（后端选择等）
+            config = dict(self.config)
+            config.update({
                 'appid': appid,
-                'key': key
-            }
+                'key': key,
+                'qps': self.qps
+            })
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
+            self.config = config
             return True
         except Exception as e:
             print(f"保存配置文件失败了: {e}")
             return False
 
     def _test_api(self, appid, key, text="test"):
-        """测试API配置是否有效"""
+        """
+        测试API配置是否有效
+        
+        Returns:
+            (is_valid, msg)，is_valid为None表示因为网络等原因无法判断
+        """
         try:
-            salt = str(random.randint(32768, 65536))
-            sign = appid + text + salt + key
-            sign = hashlib.md5(sign.encode()).hexdigest()
-            
-            params = {
-                'q': text,
-                'from': 'en',
-                'to': 'zh',
-                'appid': appid,
-                'salt': salt,
-                'sign': sign
-            }
-            
-            response = requests.get(self.url, params=params, timeout=5)
-            result = response.json()
-            
-            # 检查是否有错误码
-            if 'error_code' in result:
-                return False, result.get('error_msg', '未知的错误呢……')
-            else:
-                return True, "API配置有效"
-                
+            client = BaiduClient(appid, key, qps=self.qps, url=self.url, timeout=5)
+            client.request(text, 'en', 'zh')
+            return True, "API配置有效"
+        
+        except BaiduApiError as e:
+            # 只有认证相关的错误码才说明配置无效
+            if e.is_auth_error():
+                return False, e.error_msg
+            return None, e.error_msg
         except Exception as e:
-            return False, f"API测试失败: {str(e)}"
+            return None, f"API测试失败: {str(e)}"
 
-    def translate(self):
-        """翻译文本"""
-        # 检查API配置
+    def _check_api_config(self):
+        """检查API配置，没有配置或已知无效时请用户配置，返回是否可以继续翻译"""
+        # 没有使用百度翻译时不需要API配置
+        if self.router.get("baidu") is None:
+            return True
+        
         if not self.appid or not self.key:
             self.pet_app.show_message("检测到你没有配置翻译的API呢，请先配置一下吧", "talking2")
             self.pet_app.root.after(1000, self._ask_for_api_config)
-            return
+            return False
         
-        # 测试API配置是否有效
-        is_valid, msg = self._test_api(self.appid, self.key)
-        if not is_valid:
-            self.pet_app.show_message("抱歉……感觉API不正确呢……能麻烦输入一下你的账户和密钥吗", "denying")
-            self.pet_app.root.after(1000, self._ask_for_api_config)
+        # 已经确认过API无效，不用再发请求，直接让用户重新配置
+        if self.api_valid is False:
+            self._on_api_invalid()
+            return False
+        
+        return True
+
+    def translate(self):
+        """翻译文本"""
+        # 检查API配置
+        if not self._check_api_config():
             return
         
         # 显示提示消息
@@ -99,6 +156,18 @@ class TranslationManager:
         # 延迟一下，让消息显示完成后再弹出输入框
         self.pet_app.root.after(1000, self._ask_text_for_translation)
 
+    def _on_startup_api_tested(self, test_result):
+        """启动时的API验证完成后的回调（主线程）"""
+        is_valid, msg = test_result
+        # 用户可能已经在这期间重新配置过了
+        if self.api_valid is None:
+            self.api_valid = is_valid
+
+    def _on_api_invalid(self):
+        """API配置无效时请用户重新输入"""
+        self.pet_app.show_message("抱歉……感觉API不正确呢……能麻烦输入一下你的账户和密钥吗", "denying")
+        self.pet_app.root.after(1000, self._ask_for_api_config)
+
     def _ask_for_api_config(self):
         """请求用户输入API配置"""
         # 创建配置窗口
@@ -145,6 +214,10 @@ class TranslationManager:
         button_frame.pack(fill='x', padx=20, pady=20)
         
         def save_config():
+            # 上一次测试还没结束
+            if str(save_btn['state']) == 'disabled':
+                return
+            
             new_appid = appid_entry.get().strip()
             new_key = key_entry.get().strip()
             
@@ -152,13 +225,28 @@ class TranslationManager:
                 messagebox.showerror("发生错误了……", "APPID和密钥都不能为空", parent=config_window)
                 return
             
-            # 测试新配置是否有效
-            is_valid, msg = self._test_api(new_appid, new_key)
+            # 在后台测试新配置是否有效，测试期间禁用保存按钮
+            save_btn.config(state='disabled')
+            self.runner.submit(
+                self._test_api, new_appid, new_key,
+                callback=lambda test_result: on_config_tested(new_appid, new_key, test_result)
+            )
+        
+        def on_config_tested(new_appid, new_key, test_result):
+            if not config_window.winfo_exists():
+                return
+            save_btn.config(state='normal')
+            is_valid, msg = test_result
             if is_valid:
                 # 保存配置
                 if self._save_config(new_appid, new_key):
                     self.appid = new_appid
                     self.key = new_key
+                    self.api_valid = True
+                    baidu = self.router.get("baidu")
+                    if baidu:
+                        baidu.set_credentials(new_appid, new_key)
+                        self.router.mark_healthy("baidu")
                     config_window.destroy()
                     self.pet_app.show_message("API配置成功了！谢谢你！现在可以使用翻译功能了", "talking1")
                     # 延迟后开始翻译流程
@@ -170,7 +258,12 @@ class TranslationManager:
         
         def cancel_config():
             config_window.destroy()
-            self.pet_app.show_message("已取消API配置", "denying")
+            if self.appid and self.key:
+                self.pet_app.show_message("已取消API配置", "denying")
+                return
+            # 没有API也可以先用离线词典翻译
+            self.pet_app.show_message("已取消API配置，先用离线词典帮你翻译吧", "talking1")
+            self.pet_app.root.after(1500, self._ask_text_for_translation)
         
         save_btn = tk.Button(button_frame, text="保存", command=save_config, bg='lightgreen')
         save_btn.pack(side='left', padx=10)
@@ -191,68 +284,275 @@ class TranslationManager:
         """询问要翻译的文本"""
         text = simpledialog.askstring("翻译", "请你输入要翻译的文字:", parent=self.pet_app.root)
         
-        if text:
+        if text and len(text.encode('utf-8')) > MAX_QUERY_BYTES:
+            # 长文本一次请求放不下，分块流式翻译
+            self._start_streaming(io.StringIO(text), "长文本翻译中……\n\n")
+        elif text:
             self._perform_translation(text)
         else:
             self.pet_app.show_message("已取消翻译", "denying")
 
-    def _perform_translation(self, text):
-        """执行翻译"""
+    def translate_file(self):
+        """翻译整个文本文件，译文边翻译边显示，并保存到同目录下的 .translated 文件"""
+        if not self._check_api_config():
+            return
+        
+        path = filedialog.askopenfilename(
+            parent=self.pet_app.root,
+            title="选择要翻译的文本文件",
+            filetypes=[("文本文件", "*.txt *.md"), ("所有文件", "*.*")]
+        )
+        if not path:
+            self.pet_app.show_message("已取消翻译", "denying")
+            return
+        
+        base, ext = os.path.splitext(path)
+        output_path = f"{base}.translated{ext or '.txt'}"
         try:
-            # 检测语言
-            from_lang = self._detect_language(text)
-            to_lang = 'zh' if from_lang == 'en' else 'en'
-            
-            # 调用百度翻译API
-            result = self._baidu_translate(text, from_lang, to_lang)
-            
-            if result:
-                from_lang_name = "英文" if from_lang == 'en' else "中文"
-                to_lang_name = "中文" if to_lang == 'zh' else "英文"
-                
-                message = f"{from_lang_name}:\n{text}\n\n{to_lang_name}:\n{result}"
-                self.pet_app.show_message(message, "talking1")
-            else:
-                self.pet_app.show_message("翻译失败，请检查API配置", "denying")
-                
+            source = open(path, 'r', encoding='utf-8', errors='replace')
+            output = open(output_path, 'w', encoding='utf-8')
         except Exception as e:
-            self.pet_app.show_message(f"翻译时出错:\n{str(e)}", "denying")
+            self.pet_app.show_message(f"打开文件时出错:\n{str(e)}", "denying")
+            return
+        
+        self._start_streaming(source, f"正在翻译 {os.path.basename(path)} ……\n\n", output)
 
-    def _detect_language(self, text):
-        """检测文本语言"""
-        # 简单的语言检测：如果包含中文字符，则认为是中文，否则是英文
-        for char in text:
-            if '\u4e00' <= char <= '\u9fff':
-                return 'zh'
-        return 'en'
+    def _start_streaming(self, source, header, output=None):
+        """
+        开始流式翻译
+        
+        Args:
+            source: 可以逐行读取的文本来源（文件对象或StringIO），结束后会被关闭
+            header: 显示在对话框开头的提示
+            output: 译文输出文件，None表示只显示不保存
+        """
+        # 同一时间只进行一个流式翻译
+        self._stop_streaming()
+        
+        self.pet_app.begin_stream_message(header)
+        self.stream_source = source
+        self.stream_output = output
+        self.stream = StreamingTranslation(
+            self.runner,
+            iter_text_chunks(source, MAX_QUERY_BYTES),
+            self._translate_chunk,
+            on_chunk=self._on_stream_chunk,
+            on_done=self._on_stream_done,
+            on_error=self._on_stream_error,
+            max_in_flight=2
+        ).start()
+
+    def _translate_chunk(self, chunk):
+        """翻译一个文本块（在后台线程中运行），保留块内的空行和结尾的换行"""
+        content = chunk.rstrip('\n')
+        tail = chunk[len(content):]
+        if not content.strip():
+            return chunk
+        
+        from_lang, to_lang = self._detect_language(content)
+        result, backend_name = self._fetch_translation(content, from_lang, to_lang)
+        return result + tail
+
+    def _on_stream_chunk(self, index, translated):
+        """收到一块译文（主线程）"""
+        if self.stream_output:
+            self.stream_output.write(translated)
+        self.pet_app.append_stream_message(translated)
+
+    def _on_stream_done(self, chunk_count):
+        """流式翻译完成（主线程）"""
+        output_name = self.stream_output.name if self.stream_output else None
+        self._stop_streaming()
+        footer = f"\n\n翻译完成，译文已保存到:\n{output_name}" if output_name else "\n\n翻译完成"
+        self.pet_app.append_stream_message(footer)
+
+    def _on_stream_error(self, error):
+        """流式翻译出错（主线程）"""
+        self._stop_streaming()
+        if self.api_valid is False:
+            self._on_api_invalid()
+        else:
+            self.pet_app.show_message(f"翻译时出错:\n{str(error)}", "denying")
+
+    def _stop_streaming(self):
+        """停止流式翻译并关闭文件"""
+        if self.stream:
+            self.stream.cancel()
+            self.stream = None
+        for f in (self.stream_source, self.stream_output):
+            if f:
+                try:
+                    f.close()
+                except Exception as e:
+                    print(f"关闭文件失败: {e}")
+        self.stream_source = None
+        self.stream_output = None
+
+    def _perform_translation(self, text):
+        """执行翻译（请求在后台线程中进行，结果回到主线程显示）"""
+        self.pet_app.show_message("正在翻译，请稍等……", "talking2")
+        return self.runner.submit(
+            self._translate_text, text,
+            callback=lambda translation: self._on_translation_done(text, translation),
+            error_callback=lambda e: self.pet_app.show_message(f"翻译时出错:\n{str(e)}", "denying")
+        )
 
-    def _baidu_translate(self, text, from_lang, to_lang):
-        """调用百度翻译API"""
+    def _translate_text(self, text):
+        """检测语言并翻译（在后台线程中运行，不能操作界面）"""
+        # 检测语言
+        from_lang, to_lang = self._detect_language(text)
+        
         try:
-            salt = str(random.randint(32768, 65536))
-            sign = self.appid + text + salt + self.key
-            sign = hashlib.md5(sign.encode()).hexdigest()
-            
-            params = {
-                'q': text,
-                'from': from_lang,
-                'to': to_lang,
-                'appid': self.appid,
-                'salt': salt,
-                'sign': sign
-            }
-            
-            response = requests.get(self.url, params=params, timeout=10)
-            result = response.json()
+            result, backend_name = self._fetch_translation(text, from_lang, to_lang)
+        except Exception as e:
+            print(f"翻译失败了: {e}")
+            return from_lang, to_lang, None
+        
+        if backend_name == "offline":
+            result = f"{result}\n（离线词典）"
+        
+        return from_lang, to_lang, result
+
+    def _fetch_translation(self, text, from_lang, to_lang):
+        """
+        获取一条文本的译文（在后台线程中运行）
+        
+        先查缓存，没有命中再交给翻译后端（百度API不可用时会自动换成其它后端）。
+        相同的 (文本, 源语言, 目标语言) 正在翻译时，不再发新的请求，等那一次的结果
+        
+        Returns:
+            (译文, 后端名字)，命中缓存时后端名字为None
+        
+        Raises:
+            所有后端都失败时的异常
+        """
+        result = self.cache.get(text, from_lang, to_lang)
+        if result is not None:
+            return result, None
+        
+        key = (self.cache.normalize(text), from_lang, to_lang)
+        return self.flight.do(key, self._fetch_uncached, text, from_lang, to_lang)
+
+    def _fetch_uncached(self, text, from_lang, to_lang):
+        """_fetch_translation 中真正请求后端的部分，同一个key同时只会有一个在运行"""
+        # 上一次相同的请求可能刚刚结束，结果已经写进缓存了
+        result = self.cache.get(text, from_lang, to_lang)
+        if result is not None:
+            return result, None
+        
+        result, backend = self.router.translate(text, from_lang, to_lang)
+        self._on_backend_success(backend)
+        if backend.cacheable:
+            self.cache.put(text, from_lang, to_lang, result)
+        return result, backend.name
+
+    def _on_backend_success(self, backend):
+        """后端翻译成功（后台线程）"""
+        if backend.name == "baidu":
+            self.api_valid = True
+
+    def _on_backend_error(self, backend, error):
+        """某个后端翻译失败（后台线程），百度返回认证错误时标记API配置失效"""
+        if isinstance(error, BaiduApiError):
+            print(f"翻译API错误: {error.error_code} - {error.error_msg}")
+            if error.is_auth_error():
+                self.api_valid = False
+        else:
+            print(f"翻译后端 {backend.name} 出错了: {error}")
+
+    def _on_translation_done(self, text, translation):
+        """翻译完成后的回调（主线程）"""
+        from_lang, to_lang, result = translation
+        if not result and self.api_valid is False:
+            # 翻译时返回了认证错误，说明配置失效了
+            self._on_api_invalid()
+        elif result:
+            from_lang_name = LANGUAGE_NAMES.get(from_lang, from_lang)
+            to_lang_name = LANGUAGE_NAMES.get(to_lang, to_lang)
             
-            if 'trans_result' in result:
-                return result['trans_result'][0]['dst']
+            message = f"{from_lang_name}:\n{text}\n\n{to_lang_name}:\n{result}"
+            self.pet_app.show_message(message, "talking1")
+        else:
+            self.pet_app.show_message("翻译失败，请检查API配置", "denying")
+
+    def cancel_translation(self):
+        """取消所有还没完成的翻译请求"""
+        if self.runner.has_pending() or self.stream:
+            self._stop_streaming()
+            self.runner.cancel_all()
+            self.pet_app.show_message("已取消翻译", "denying")
+        else:
+            self.pet_app.show_message("没有正在进行的翻译", "denying")
+
+    def close(self):
+        """退出前释放后台线程和缓存"""
+        self._stop_streaming()
+        self.runner.shutdown()
+        self.cache.close()
+        self.offline_dict.close()
+
+    def get_cache_stats(self):
+        """获取翻译缓存的命中统计"""
+        return self.cache.stats()
+
+    def _detect_language(self, text):
+        """
+        检测文本语言并选择翻译方向：中文翻译成英文，其它语言（英日韩俄）翻译成中文
+        
+        Returns:
+            (from_lang, to_lang)
+        """
+        return choose_language_pair(text)
+
+    def translate_batch(self, texts, from_lang=None, to_lang=None):
+        """
+        批量翻译（在后台线程中调用）
+        
+        先查缓存，没有命中的文本按语言分组后打包成尽量少的请求
+        
+        Args:
+            texts: 要翻译的文本列表，例如文件名或注释内容
+            from_lang: 源语言，None表示逐条自动检测
+            to_lang: 目标语言，None表示根据源语言自动选择
+        
+        Returns:
+            与texts一一对应的译文列表，翻译失败的位置为None
+        """
+        results = [None] * len(texts)
+        
+        # 查缓存，把没命中的按(源语言, 目标语言)分组
+        groups = {}
+        for i, text in enumerate(texts):
+            detected_from, detected_to = self._detect_language(text)
+            src = from_lang or detected_from
+            dst = to_lang or (detected_to if src == detected_from else ('en' if src == 'zh' else 'zh'))
+            cached = self.cache.get(text, src, dst)
+            if cached is not None:
+                results[i] = cached
             else:
-                error_code = result.get('error_code', '未知错误')
-                error_msg = result.get('error_msg', '未知错误')
-                print(f"翻译API错误: {error_code} - {error_msg}")
-                return None
-                
-        except Exception as e:
-            print(f"调用翻译API时出错了: {e}")
-            return None
\ No newline at end of file
+                groups.setdefault((src, dst), []).append(i)
+        
+        for (src, dst), indexes in groups.items():
+            group = [texts[i] for i in indexes]
+            try:
+                # 完全相同的一批文本正在翻译时，等那一次的结果
+                translated = self.flight.do(
+                    (tuple(group), src, dst), self._fetch_batch_uncached, group, src, dst
+                )
+            except Exception as e:
+                print(f"批量翻译时出错了: {e}")
+                continue
+            
+            for i, result in zip(indexes, translated):
+                results[i] = result
+        
+        return results
+
+    def _fetch_batch_uncached(self, texts, from_lang, to_lang):
+        """把一组没命中缓存的文本交给翻译后端，并写入缓存"""
+        translated, backend = self.router.translate_batch(texts, from_lang, to_lang)
+        self._on_backend_success(backend)
+        if backend.cacheable:
+            for text, result in zip(texts, translated):
+                self.cache.put(text, from_lang, to_lang, result)
+        return translated
\ No newline at end of file